@@ -11,9 +11,25 @@
 # Updated the code to solve both nrooks and nqueens based on the input parameters
 # The unavailable tile is accounted for in this code
 # Used numpy array to calculate the # of rooks or queens along each diagonal
+# The bitmask engine (the default) places one piece per row and keeps the used columns and diagonals
+# as integer bitmasks, the original board search is still available with --engine dfs
+# More squares can be made unavailable with --block or a mask file, every row then gets a bitmask of
+# the columns it may use and the bitmask engine prunes a branch as soon as a row below, or a column
+# still unused, has no square left. It restarts in random orders when a search takes too long
+# --engine minconflicts repairs a random N-queens placement by swapping columns, which finds a solution
+# for hundreds of thousands of queens in seconds, use --output to write it as one column per row
 
-import sys
+import random
+import argparse
+import multiprocessing
 import numpy as np
+from searchstats import SearchStats
+
+# The stats of a search are only updated every so many expanded boards
+check_interval = 1024
+
+# Unavailable squares besides (x, y), as (row, column) pairs counted from 1 like x and y
+blocked = []
 
 
 # Count # of pieces in given row
@@ -41,13 +57,37 @@ def count_np_diag(board):
 #### END CODE QUOTATION      
     return sum_each_diagonal
         
+# The unavailable squares that are on the board, as (row, column) pairs counted from 0
+def unavailable():
+    cells = [(x, y)] + [tuple(cell) for cell in blocked]
+    return set((r - 1, c - 1) for r, c in cells if 1 <= r <= N and 1 <= c <= N)
+
+# For each row, the bitmask of the columns a piece may use: bit c is set when square (row, c) is available
+def allowed_columns(cells=None):
+    allowed = [(1 << N) - 1] * N
+    for r, c in unavailable() if cells is None else cells:
+        allowed[r] &= ~(1 << c)
+    return allowed
+
+# Read a mask file: one line per row of the board, with an X for each unavailable square and any
+# other character, such as _ or ., for an available one. Spaces are ignored, so a board printed
+# by this program can be used as a mask. Returns the size of the board and the unavailable squares
+# as (row, column) pairs counted from 1.
+def read_mask(filename):
+    rows = [line.replace(" ","").rstrip("\r\n") for line in open(filename)]
+    rows = [row for row in rows if row]
+    cells = [(r + 1, c + 1) for r, row in enumerate(rows) for c, square in enumerate(row) if square in "Xx"]
+    return len(rows), cells
+
 # Return a string with the board rendered in a human-friendly format
 # Modified by Snehal Vartak to reflect the unavailable tile 
 def printable_board(board):
-    return "\n".join([" ".join(["X" if col == (y-1) and row == (x-1) else "R" if board[row][col]==1 else "_" for col in range(0,N)]) for row in range(0,N)])
+    allowed = allowed_columns()
+    return "\n".join([" ".join(["X" if not allowed[row] >> col & 1 else "R" if board[row][col]==1 else "_" for col in range(0,N)]) for row in range(0,N)])
 
 def printable_queens_board(board):
-    return "\n".join([" ".join(["X" if col == (y-1) and row == (x-1) else "Q" if board[row][col]==1 else "_" for col in range(0,N)]) for row in range(0,N)])
+    allowed = allowed_columns()
+    return "\n".join([" ".join(["X" if not allowed[row] >> col & 1 else "Q" if board[row][col]==1 else "_" for col in range(0,N)]) for row in range(0,N)])
 
 
 # Add a piece to the board at the given position, and return a new board (doesn't change original)
@@ -57,14 +97,17 @@ def add_piece(board, row, col):
 # Get list of successors of given board state where total number of queens 
 # at any time is less than or equal to N and successors with no new moves are removed.
 # Modified the successors2() for nqueens to remove the states where the diagonals had more than one queen.- Snehal Vartak  
-def successors_queens(board):
+# allowed holds the columns each row may use, from allowed_columns()
+def successors_queens(board,allowed=None):
     succ_list_queens = []
+    if allowed is None:
+        allowed = allowed_columns()
     
     for r in range(0,N):
         if count_on_row(board,r) == 1:
             continue
         for c in range(0,N):
-            if count_on_col(board,c)==1 or (r == x-1 and c==y-1):
+            if count_on_col(board,c)==1 or not allowed[r] >> c & 1:
                 continue
             interim_board = add_piece(board,r,c)
             if count_pieces(interim_board) <= N and interim_board != board:
@@ -76,14 +119,16 @@ def successors_queens(board):
 # Successor function for nrooks from my nrooks.py submission
 # Get list of successors of given board state where total number of 
 # rooks at any time is less than or equal to N and successors with no new moves are removed.
-def successors2(board):
+def successors2(board,allowed=None):
     succ_list = []
+    if allowed is None:
+        allowed = allowed_columns()
     
     for r in range(0,N):
         if count_on_row(board,r) == 1:
             continue
         for c in range(0,N):
-            if count_on_col(board,c)== 1 or (r == x-1 and c==y-1):
+            if count_on_col(board,c)== 1 or not allowed[r] >> c & 1:
                 continue
             interim_board = add_piece(board,r,c)
             if count_pieces(interim_board) <= N and interim_board != board:
@@ -96,52 +141,673 @@ def is_goal(board):
             all([count_on_col(board,c) == 1 for c in range(0,N)])
 
 
-# Solve n-queens!
-def solve_queens(initial_board):
+# Depth first search shared by n-queens and n-rooks
+# stats is an optional SearchStats that gets the counters of the search.
+# The depth is the number of pieces on the board, it is only counted when the stats are updated.
+def solve_dfs(initial_board,successors,stats):
     fringe = [initial_board]
-    while len(fringe) > 0:
-        for s in successors_queens(fringe.pop()):
-            if is_goal(s):
-                return (s)
-            fringe.append(s)
-    return False
+    expanded = generated = depth = 0
+    timing = stats is not None and stats.timing
+    if stats is not None:
+        stats.begin()
+    if timing:
+        successors = stats.timed('successors', successors)
+        goal = stats.timed('goal test', is_goal)
+    else:
+        goal = is_goal
+    try:
+        while len(fringe) > 0:
+            board = fringe.pop()
+            expanded += 1
+            if stats is not None and expanded % check_interval == 0:
+                depth = max(depth, count_pieces(board))
+                stats.update(generated,expanded,0,len(fringe),0,depth)
+            for s in successors(board):
+                generated += 1
+                if goal(s):
+                    depth = N
+                    return (s)
+                fringe.append(s)
+        return False
+    finally:
+        if stats is not None:
+            stats.finish(generated,expanded,0,len(fringe),0,depth)
+
+# Solve n-queens!
+def solve_queens(initial_board,stats=None):
+    allowed = allowed_columns()
+    return solve_dfs(initial_board,lambda board: successors_queens(board,allowed),stats)
 
 # Solve n-rooks!
-def solve_rooks(initial_board):
-    fringe = [initial_board]
-    while len(fringe) > 0:
-        for s in successors2(fringe.pop()):
-            if is_goal(s):
-                return (s)
-            fringe.append(s)
-    return False
-
-if len(sys.argv) != 5:
-    print ("Please pass 4 arguments:\n 1: nrook or nqueen \n 2: size of the board, N \
-           \n 3: x coordinate of unavailable tile \n 4: y coordinate of unavailable tile.")
-else:
+def solve_rooks(initial_board,stats=None):
+    allowed = allowed_columns()
+    return solve_dfs(initial_board,lambda board: successors2(board,allowed),stats)
+
+
+# Bitmask engine
+# Places one piece per row, from the top row down. Bit c of a mask stands for column c, and the
+# columns and diagonals that already hold a piece are kept as integer bitmasks, so the free columns
+# of a row come from a few bit operations instead of building and scanning a new board.
+# A diagonal going down to the right is numbered row + col, one going down to the left col - row + N - 1.
+# The squares each row may use come from allowed_columns().
+
+# Forward checking: False when some row from row down has no available column that is not attacked.
+# left and right are the diagonals attacking row, they move one column over with every row.
+# This costs a pass over the rows below for every piece placed, so the searches only do it when more
+# than one square is unavailable.
+def rows_open(row,cols,left,right,allowed,full):
+    for r in range(row,N):
+        if not allowed[r] & ~(cols | left | right):
+            return False
+        left = left << 1 & full
+        right >>= 1
+    return True
+
+# Column of the piece in each row of a known N-queens solution, used to decide which free column
+# to try first. Explicit construction from https://en.wikipedia.org/wiki/Eight_queens_puzzle
+def queens_hint(n):
+    evens = list(range(1,n,2))
+    odds = list(range(0,n,2))
+    if n % 6 == 2:
+        odds = [2,0] + odds[3:] + [4] if n > 4 else odds
+    elif n % 6 == 3:
+        evens = evens[1:] + evens[:1]
+        odds = odds[2:] + odds[:2]
+    return evens + odds
+
+# The 8 rotations and reflections of a solution, as columns per row
+def symmetries(placement):
+    n = len(placement)
+    images = []
+    current = placement
+    for turn in range(0,4):
+        images.append(current)
+        images.append([n - 1 - c for c in current])
+        # Rotate by a quarter turn: the piece in row r and column c goes to row c and column n-1-r
+        rotated = [0]*n
+        for r, c in enumerate(current):
+            rotated[c] = n - 1 - r
+        current = rotated
+    return images
+
+# Find a board for N pieces, queens or rooks, that avoids the unavailable squares.
+# The column a known solution uses is tried first in each row, taken from the rotation or
+# reflection of the solution that uses the fewest unavailable squares, so with a single one the
+# search only backtracks when no such solution exists. Returns the columns of the pieces per row or False.
+# With more than one unavailable square the search goes to solve_masked() instead.
+def solve_bitmask(queens,stats=None):
+    cells = unavailable()
+    allowed = allowed_columns(cells)
+    hint = queens_hint(N) if queens else list(range(0,N))
+    images = symmetries(hint) if N > 1 else [hint]
+    hint = min(images, key=lambda image: sum(1 for r, c in cells if image[r] == c))
+    if len(cells) > 1:
+        return solve_masked(queens,allowed,hint,stats)
+    if stats is not None:
+        stats.begin()
+    placed = 0
+    # For each row on the current path: the columns not tried yet and the masks before the piece was placed
+    untried = [0]*N
+    saved = [None]*N
+    placement = [0]*N
+    cols = diag = anti = 0
+    row = 0
+    free = allowed[0]
+    try:
+        while True:
+            if free == 0:
+                row -= 1
+                if row < 0:
+                    return False
+                cols, diag, anti = saved[row]
+                free = untried[row]
+                continue
+            bit = 1 << hint[row]
+            if not free & bit:
+                bit = free & -free
+            free ^= bit
+            untried[row] = free
+            saved[row] = (cols, diag, anti)
+            placement[row] = bit.bit_length() - 1
+            placed += 1
+            cols |= bit
+            if queens:
+                diag |= bit << row
+                anti |= bit << (N - 1 - row)
+            row += 1
+            if row == N:
+                return placement
+            free = allowed[row] & ~cols
+            if queens:
+                free &= ~(diag >> row) & ~(anti >> (N - 1 - row))
+    finally:
+        if stats is not None:
+            stats.finish(placed,placed,0,row,0,row)
+
+# Search for boards with many unavailable squares. The rows are not filled top down: every step
+# works out the free columns of all the rows still empty, backtracks as soon as one of them has
+# none left or a column still unused has no free square left in any of them (forward checking) and
+# otherwise places a piece in the row with the fewest free columns.
+# Queens: a search can still get lost deep in a part of the board without solutions, so it is run with
+# a budget of pieces placed, first in the order of hint and then restarted in random orders with
+# twice the budget each time. When every budget runs out min-conflicts gets a go, and only when that
+# fails too is the search run to the end, which can then tell there is no solution.
+# Rooks are a matching of the rows to the columns they may use, which match_rooks() finds directly.
+# Returns the columns of the pieces per row or False.
+def solve_masked(queens,allowed,hint,stats=None):
+    if not queens:
+        return match_rooks(allowed,stats)
+    rnd = random.Random(0)
+    budget = masked_budget*N
+    placed = 0
+    if stats is not None:
+        stats.begin()
+    try:
+        for attempt in range(0,masked_restarts):
+            placement, count = search_masked(allowed,hint if attempt == 0 else None,budget,rnd)
+            placed += count
+            if placement is not None:
+                return placement
+            budget *= 2
+        placement = solve_min_conflicts(0)
+        if placement:
+            return placement
+        placement, count = search_masked(allowed,hint,None,rnd)
+        placed += count
+        return placement
+    finally:
+        if stats is not None:
+            stats.finish(placed,placed,0,0,0,N)
+
+# Pieces placed by the first run of solve_masked() per row of the board, and the number of runs
+# before it gives the board to min-conflicts
+masked_budget = 4
+masked_restarts = 6
+
+# One run of the search of solve_masked(). With hint the column of hint is tried first and ties between
+# rows go to the first one, without it both are picked at random with rnd. Returns the placement, False
+# when there is none or None when more than budget pieces were placed, with the number of pieces placed.
+def search_masked(allowed,hint,budget,rnd):
+    full = (1 << N) - 1
+    placed = 0
+    placement = [0]*N
+    rows = list(range(0,N))
+    # For each piece on the current path: its row, the columns of the row not tried yet and the masks
+    # before the piece was placed
+    stack = []
+    cols = diag = anti = 0
+    while rows:
+        if budget is not None and placed > budget:
+            return None, placed
+        row, free, fewest, reachable = -1, 0, N + 1, 0
+        for r in rows:
+            f = allowed[r] & ~cols & ~(diag >> r) & ~(anti >> (N - 1 - r))
+            n = bin(f).count('1')
+            reachable |= f
+            if n < fewest or (n == fewest and hint is None and rnd.random() < 0.5):
+                row, free, fewest = r, f, n
+                if n == 0:
+                    break
+        if free and reachable != full & ~cols:
+            free = 0
+        if free:
+            rows.remove(row)
+        else:
+            # Take back pieces until one of them has a column left to try
+            while True:
+                if not stack:
+                    return False, placed
+                row, free, cols, diag, anti = stack.pop()
+                if free:
+                    break
+                rows.append(row)
+        if hint is not None:
+            bit = 1 << hint[row]
+            if not free & bit:
+                bit = free & -free
+        else:
+            bit = free
+            for i in range(0,rnd.randrange(bin(free).count('1'))):
+                bit &= bit - 1
+            bit &= -bit
+        stack.append((row, free ^ bit, cols, diag, anti))
+        placement[row] = bit.bit_length() - 1
+        placed += 1
+        cols |= bit
+        diag |= bit << row
+        anti |= bit << (N - 1 - row)
+    return placement, placed
+
+# N rooks on the available squares are a perfect matching of the rows to the columns they may use.
+# The rows are matched one at a time: a breadth first search from the new row over the columns it may
+# use, and on to the rows holding those columns, ends at a column nobody holds, and every row along
+# the way moves over to the column it reached (an augmenting path). When no free column can be reached
+# there is no solution. Returns the columns of the pieces per row or False.
+def match_rooks(allowed,stats=None):
+    placement = [-1]*N
+    owner = [-1]*N
+    steps = 0
+    if stats is not None:
+        stats.begin()
+    try:
+        for start in range(0,N):
+            # Row each column was reached from
+            reached_from = {}
+            seen = 0
+            frontier = [start]
+            found = -1
+            while frontier and found < 0:
+                following = []
+                for r in frontier:
+                    free = allowed[r] & ~seen
+                    seen |= free
+                    while free:
+                        bit = free & -free
+                        free ^= bit
+                        c = bit.bit_length() - 1
+                        reached_from[c] = r
+                        steps += 1
+                        if owner[c] < 0:
+                            found = c
+                            break
+                        following.append(owner[c])
+                    if found >= 0:
+                        break
+                frontier = following
+            if found < 0:
+                return False
+            c = found
+            while c >= 0:
+                r = reached_from[c]
+                previous = placement[r]
+                placement[r] = c
+                owner[c] = r
+                c = previous
+        return placement
+    finally:
+        if stats is not None:
+            stats.finish(steps,steps,0,0,0,N)
+
+# All solutions
+# solutions() is a generator over every board with N pieces, as the column of the piece in each row.
+# It keeps only the current path, so memory does not grow with the number of solutions.
+# With prefix given, only the solutions with the pieces of the top rows in those columns are listed.
+def solutions(queens,prefix=()):
+    full = (1 << N) - 1
+    cells = unavailable()
+    allowed = allowed_columns(cells)
+    for row, col in enumerate(prefix):
+        allowed[row] &= 1 << col
+    forward = len(cells) > 1
+    untried = [0]*N
+    saved = [None]*N
+    placement = [0]*N
+    cols = diag = anti = 0
+    row = 0
+    free = allowed[0] if not forward or rows_open(0,0,0,0,allowed,full) else 0
+    while True:
+        if free == 0:
+            row -= 1
+            if row < 0:
+                return
+            cols, diag, anti = saved[row]
+            free = untried[row]
+            continue
+        bit = free & -free
+        free ^= bit
+        untried[row] = free
+        saved[row] = (cols, diag, anti)
+        placement[row] = bit.bit_length() - 1
+        if row == N - 1:
+            yield list(placement)
+            continue
+        cols |= bit
+        if queens:
+            diag |= bit << row
+            anti |= bit << (N - 1 - row)
+        row += 1
+        left = anti >> (N - 1 - row) if queens else 0
+        right = diag >> row if queens else 0
+        free = allowed[row] & ~(cols | left | right)
+        if forward and free and not rows_open(row + 1,cols,left << 1 & full,right >> 1,allowed,full):
+            free = 0
+
+# The solutions starting with the columns in prefix, as a list, for a worker process of all_solutions
+def solutions_from(job):
+    global N, x, y, blocked
+    N, x, y, blocked, queens, prefix = job
+    return list(solutions(queens,prefix))
+
+# The columns of the pieces in the top depth rows of every board that can be started that way, in the
+# order solutions() reaches them. Pieces on unavailable squares or attacking each other are left out.
+def top_rows(queens,depth,allowed,prefix=()):
+    row = len(prefix)
+    if row == depth:
+        yield prefix
+        return
+    for col in range(0,N):
+        if allowed[row] >> col & 1 and all(col != c and not (queens and abs(col - c) == row - r)
+                                           for r, c in enumerate(prefix)):
+            for rest in top_rows(queens,depth,allowed,prefix + (col,)):
+                yield rest
+
+# Rows left below the top rows of a part of all_solutions, which bounds the solutions in one part
+part_rows = 12
+
+# Every solution, in the same order as solutions(), with the search split across a pool of worker
+# processes by the columns of the pieces in the top rows. The split goes deep enough to leave at most
+# part_rows rows below it, so a part holds about as many solutions as a board of that size whatever N is.
+# Only a few parts more than there are workers are handed out at a time and each is yielded as soon
+# as the parts before it are done, so the solutions held at once do not grow with N.
+def all_solutions(queens,workers=None):
+    workers = workers or multiprocessing.cpu_count()
+    depth = min(N, max(2, N - part_rows))
+    jobs = ((N, x, y, blocked, queens, prefix) for prefix in top_rows(queens,depth,allowed_columns()))
+    pool = multiprocessing.Pool(workers)
+    try:
+        pending = []
+        for job in jobs:
+            pending.append(pool.apply_async(solutions_from, (job,)))
+            if len(pending) > 2*workers:
+                for solution in pending.pop(0).get():
+                    yield solution
+        for part in pending:
+            for solution in part.get():
+                yield solution
+    finally:
+        pool.terminate()
+        pool.join()
+
+# Count the ways to fill the rows from row down, given the columns and the two sets of diagonals
+# attacked in this row. The diagonal masks are shifted by one column per row so they line up with
+# the row they attack. With forward set, placements that leave a row below without a column are skipped.
+def count_below(row,cols,left,right,full,allowed,forward):
+    free = allowed[row] & ~(cols | left | right)
+    if row == N - 1:
+        return bin(free).count('1')
+    total = 0
+    while free:
+        bit = free & -free
+        free ^= bit
+        below = (cols | bit, (left | bit) << 1 & full, (right | bit) >> 1)
+        if forward and not rows_open(row + 1,below[0],below[1],below[2],allowed,full):
+            continue
+        total += count_below(row + 1,below[0],below[1],below[2],full,allowed,forward)
+    return total
+
+# Number of N-queens solutions with the pieces of the top rows in the columns of prefix, times weight
+def count_queens_from(job):
+    global N
+    N, allowed, forward, prefix, weight = job
+    full = (1 << N) - 1
+    cols = left = right = 0
+    for col in prefix:
+        bit = 1 << col
+        cols, left, right = cols | bit, (left | bit) << 1 & full, (right | bit) >> 1
+    if len(prefix) == N:
+        return weight
+    return weight * count_below(len(prefix),cols,left,right,full,allowed,forward)
+
+# Number of ways to place N rooks on the available squares, one per row and column.
+# Counts the ways to fill the rows so far for every set of used columns, row by row.
+def count_rooks(allowed):
+    ways = {0: 1}
+    for row in range(0,N):
+        next_ways = {}
+        for cols, count in ways.items():
+            free = allowed[row] & ~cols
+            while free:
+                bit = free & -free
+                free ^= bit
+                next_ways[cols | bit] = next_ways.get(cols | bit, 0) + count
+        ways = next_ways
+    return sum(ways.values())
+
+# Count all solutions, splitting the search by the columns of the pieces in the top two rows across a
+# pool of worker processes, which take the parts as they become free since they are of uneven size.
+# When the unavailable squares are symmetric left to right, only the parts with the top piece in the left
+# half of the row are searched and counted twice, plus the middle column for odd N.
+# Rooks with at most one unavailable square do not need a search: any of the N! orderings of the
+# columns works, less the (N-1)! that use the unavailable square.
+def count_solutions(queens,workers=None):
+    cells = unavailable()
+    allowed = allowed_columns(cells)
+    if not queens:
+        if len(cells) > 1:
+            return count_rooks(allowed)
+        total = 1
+        for i in range(2,N+1):
+            total *= i
+        if cells:
+            total -= total // N
+        return total
+    forward = len(cells) > 1
+    mirror = all((r, N - 1 - c) in cells for r, c in cells)
+    jobs = []
+    for prefix in top_rows(True,min(N, 2),allowed):
+        if not mirror:
+            jobs.append((N, allowed, forward, prefix, 1))
+        elif 2*prefix[0] + 1 < N:
+            jobs.append((N, allowed, forward, prefix, 2))
+        elif 2*prefix[0] + 1 == N:
+            jobs.append((N, allowed, forward, prefix, 1))
+    pool = multiprocessing.Pool(workers)
+    try:
+        return sum(pool.imap_unordered(count_queens_from, jobs, 1))
+    finally:
+        pool.terminate()
+        pool.join()
+
+# Min-conflicts local search for N-queens
+# The queens are kept as a permutation: one queen per row and a different column for each row, so two
+# queens can only ever conflict on a diagonal. diag and anti count the queens on every diagonal and
+# collisions is the number of queens beyond the first on each diagonal, which is 0 for a solution.
+# The start is built greedily, giving each row a random free column that is on no used diagonal when
+# one turns up within a few tries. Then queens in conflict swap columns with random other queens
+# whenever that lowers the collisions. When too many swaps in a row fail the search restarts.
+# The unavailable squares are never used: swaps that would put a queen on one are skipped.
+# They are looked up in a set rather than kept as bitmasks per row, which would take N*N bits.
+# Returns the column of the queen in each row, or False when every restart fails.
+def solve_min_conflicts(seed=None,restarts=50,stats=None):
+    rnd = random.Random(seed)
+    cells = unavailable()
+    tries = 20
+    patience = 1000 + 10*N
+    swaps = 0
+    if stats is not None:
+        stats.begin()
+    try:
+        for attempt in range(0,restarts):
+            placement = list(range(0,N))
+            diag = [0]*(2*N)
+            anti = [0]*(2*N)
+            stuck = False
+            for i in range(0,N):
+                for t in range(0,tries):
+                    j = rnd.randrange(i,N)
+                    c = placement[j]
+                    if diag[i + c] == 0 and anti[i - c + N] == 0 and (i, c) not in cells:
+                        placement[i], placement[j] = c, placement[i]
+                        break
+                else:
+                    j = rnd.randrange(i,N)
+                    if (i, placement[j]) in cells:
+                        # Any column left that row i may use
+                        j = next((k for k in range(i,N) if (i, placement[k]) not in cells), None)
+                        if j is None:
+                            stuck = True
+                            break
+                    placement[i], placement[j] = placement[j], placement[i]
+                diag[i + placement[i]] += 1
+                anti[i - placement[i] + N] += 1
+            if stuck:
+                continue
+            collisions = sum(v - 1 for v in diag if v > 1) + sum(v - 1 for v in anti if v > 1)
+            # Each pass tries a swap for every queen in conflict, give up after too many swaps in a row failed.
+            # Only the two queens of a swap can join a diagonal, so the queens in conflict after a pass are
+            # among those still in conflict and those that were just swapped.
+            conflicts = [i for i in range(0,N) if diag[i + placement[i]] > 1 or anti[i - placement[i] + N] > 1]
+            failed = 0
+            while collisions > 0 and failed < patience:
+                still_in_conflict = []
+                for i in conflicts:
+                    ci = placement[i]
+                    if diag[i + ci] == 1 and anti[i - ci + N] == 1:
+                        continue
+                    j = rnd.randrange(0,N)
+                    cj = placement[j]
+                    failed += 1
+                    if j == i or (cells and ((i, cj) in cells or (j, ci) in cells)):
+                        still_in_conflict.append(i)
+                        continue
+                    before = collisions
+                    for r, c in ((i, ci), (j, cj)):
+                        diag[r + c] -= 1
+                        anti[r - c + N] -= 1
+                        collisions -= (diag[r + c] > 0) + (anti[r - c + N] > 0)
+                    for r, c in ((i, cj), (j, ci)):
+                        collisions += (diag[r + c] > 0) + (anti[r - c + N] > 0)
+                        diag[r + c] += 1
+                        anti[r - c + N] += 1
+                    swaps += 1
+                    if collisions < before:
+                        placement[i], placement[j] = cj, ci
+                        failed = 0
+                        for r, c in ((i, cj), (j, ci)):
+                            if diag[r + c] > 1 or anti[r - c + N] > 1:
+                                still_in_conflict.append(r)
+                        continue
+                    # Put both queens back
+                    for r, c in ((i, cj), (j, ci)):
+                        diag[r + c] -= 1
+                        anti[r - c + N] -= 1
+                    for r, c in ((i, ci), (j, cj)):
+                        diag[r + c] += 1
+                        anti[r - c + N] += 1
+                    collisions = before
+                    still_in_conflict.append(i)
+                conflicts = still_in_conflict
+            if collisions == 0:
+                return placement
+        return False
+    finally:
+        if stats is not None:
+            stats.finish(swaps,swaps,0,0,0,N)
+
+# Write a solution as one line per row with the column of its queen, counted from 1
+def write_placement(placement,filename):
+    output = open(filename,"w")
+    output.write("\n".join(str(col + 1) for col in placement) + "\n")
+    output.close()
+
+# Board as a list-of-lists from the column of the piece in each row
+def placement_board(placement):
+    board = [[0] * N for row in range(0,N)]
+    for row, col in enumerate(placement):
+        board[row][col] = 1
+    return board
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Solve the N-rooks or N-queens problem with unavailable squares")
+    parser.add_argument("code_to_run", help="nrook or nqueen")
+    parser.add_argument("N", type=int, help="size of the board, N")
+    parser.add_argument("x", type=int, help="x coordinate of unavailable tile")
+    parser.add_argument("y", type=int, help="y coordinate of unavailable tile")
+    parser.add_argument("--block", action="append", default=[], metavar="X,Y",
+                        help="make square X,Y unavailable as well, can be given more than once")
+    parser.add_argument("--mask", metavar="FILE",
+                        help="make the squares marked X in FILE unavailable as well, one line per row of the board")
+    parser.add_argument("--engine", choices=["bitmask","dfs","minconflicts"], default="bitmask",
+                        help="bitmask places one piece per row using bitmasks, dfs is the original board search, "
+                             "minconflicts is a local search for large N-queens boards")
+    parser.add_argument("--seed", type=int, help="random seed for --engine minconflicts")
+    parser.add_argument("--output", metavar="FILE",
+                        help="write the solution to FILE, one line per row with the column of the piece, "
+                             "instead of printing the board")
+    parser.add_argument("--all", action="store_true",
+                        help="print every solution, one line per solution with the column of the piece in each row")
+    parser.add_argument("--count", action="store_true", help="print the number of solutions")
+    parser.add_argument("--workers", type=int, default=multiprocessing.cpu_count(),
+                        help="number of worker processes for --count and --all, defaults to the number of cores")
+    parser.add_argument("--stats-json", metavar="FILE", help="write the counters of the search to FILE as JSON")
+    parser.add_argument("--progress", type=float, metavar="SECONDS",
+                        help="print a progress line to stderr every SECONDS seconds")
+    parser.add_argument("--phase-times", action="store_true",
+                        help="time the phases of the search for --stats-json, this slows the search down")
+    args = parser.parse_args()
+
     # Decide which code to run based on input argument:
-    code_to_run = str(sys.argv[1])
+    code_to_run = args.code_to_run
     
     # This is N, the size of the board. It is passed through command line arguments.
-    N = int(sys.argv[2])
+    N = args.N
     
     #    Define x and y as the row and column co-ordinates for the unavailable square
-    x = int(sys.argv[3])
-    y = int(sys.argv[4])
+    x = args.x
+    y = args.y
+    try:
+        blocked = [tuple(int(v) for v in cell.split(",")) for cell in args.block]
+        if any(len(cell) != 2 for cell in blocked):
+            raise ValueError
+    except ValueError:
+        parser.error("--block takes the row and column of a square, such as 2,3")
+    if args.mask:
+        size, cells = read_mask(args.mask)
+        if size != N:
+            parser.error("the mask in %s has %d rows but N is %d" % (args.mask, size, N))
+        blocked += cells
     
     # The board is stored as a list-of-lists. Each inner list is a row of the board.
     # A zero in a given square indicates no piece, and a 1 indicates a piece.
     initial_board = [[0] * N] * N
+    stats = SearchStats(args.phase_times,args.progress)
     
     
-    if code_to_run == "nqueen":
+    if code_to_run not in ("nqueen", "nrook"):
+        print ("Please pass proper arguments!")
+    elif args.engine == "minconflicts" and code_to_run != "nqueen":
+        print ("--engine minconflicts only solves nqueen")
+    elif args.output:
+        if args.engine == "minconflicts":
+            placement = solve_min_conflicts(args.seed,stats=stats)
+            # Local search cannot tell a board without solutions from bad luck, small boards are searched exactly
+            if not placement and N <= 12:
+                placement = solve_bitmask(True,stats)
+        elif args.engine == "bitmask":
+            placement = solve_bitmask(code_to_run == "nqueen",stats)
+        else:
+            board = solve_queens(initial_board,stats) if code_to_run == "nqueen" else solve_rooks(initial_board,stats)
+            placement = [row.index(1) for row in board] if board else False
+        if placement:
+            write_placement(placement,args.output)
+            print ("Solution written to " + args.output)
+        else:
+            print ("Sorry, no solution found. :(")
+    elif args.count:
+        print (count_solutions(code_to_run == "nqueen",args.workers))
+    elif args.all:
+        for solution in all_solutions(code_to_run == "nqueen",args.workers):
+            print (" ".join(str(col + 1) for col in solution))
+    elif code_to_run == "nqueen":
         print ("Starting from initial board:\n" + printable_queens_board(initial_board) + "\n\nLooking for solution...\n")
-        solution_queens = solve_queens(initial_board)
+        if args.engine == "bitmask":
+            solution_queens = solve_bitmask(True,stats)
+            solution_queens = placement_board(solution_queens) if solution_queens else False
+        elif args.engine == "minconflicts":
+            solution_queens = solve_min_conflicts(args.seed,stats=stats)
+            if not solution_queens and N <= 12:
+                solution_queens = solve_bitmask(True,stats)
+            solution_queens = placement_board(solution_queens) if solution_queens else False
+        else:
+            solution_queens = solve_queens(initial_board,stats)
         print (printable_queens_board(solution_queens) if solution_queens else "Sorry, no solution found. :(")
     elif code_to_run == "nrook":
         print ("Starting from initial board:\n" + printable_board(initial_board) + "\n\nLooking for solution...\n")
-        solution_rooks = solve_rooks(initial_board)
+        if args.engine == "bitmask":
+            solution_rooks = solve_bitmask(False,stats)
+            solution_rooks = placement_board(solution_rooks) if solution_rooks else False
+        else:
+            solution_rooks = solve_rooks(initial_board,stats)
         print (printable_board(solution_rooks) if solution_rooks else "Sorry, no solution found. :(")
-    else:
-        print ("Please pass proper arguments!")
+    if args.stats_json:
+        stats.write_json(args.stats_json)
@@ -0,0 +1,235 @@
+#!/usr/bin/env python
+# bench.py : Benchmarks for the 16 puzzle, n-rooks and n-queens solvers
+#
+# Usage: python bench.py [--output FILE] [--baseline FILE] [--threshold FRACTION] [--repeat K] [--cases TEXT]
+#        python bench.py --compare OLD NEW [--threshold FRACTION]
+#
+# The cases are fixed: 16 puzzle boards with known optimal solution lengths for every search of
+# solver16.py, and n-queens and n-rooks boards with unavailable squares for the searches of a0.py
+# and nrooks.py. Every run of a case is checked, a 16 puzzle solution must have the optimal number of
+# moves and reach the goal and a board must hold a piece in every row that no other piece can take.
+#
+# For every case the results hold the wall time, the time the search measured itself, the nodes
+# expanded, expansions per second and the peak memory of the process. Each run of a case is done in a
+# fresh worker process so the peak memory belongs to that case alone. With --repeat the fastest run
+# is kept.
+#
+# The results are written as JSON with --output. --baseline compares the run with an earlier results
+# file and --compare compares two results files. A case is a regression when its time, nodes expanded
+# or peak memory grew by more than --threshold (a fraction, 0.1 is 10%) or when it no longer passes its
+# check. Times under --min-seconds are not compared. The exit status is 1 when there are regressions.
+
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import multiprocessing
+import random
+import numpy as np
+import a0
+import pdb16
+import nrooks
+import solver16
+from searchstats import SearchStats
+from solver16 import TimeLimitExceeded
+
+
+# 16 puzzle boards, the 16 numbers in row order, with the number of moves of an optimal solution
+boards = [(8, "1 2 7 3 5 10 6 11 0 9 8 4 13 14 15 12"),
+          (12, "1 2 3 4 9 15 5 6 13 11 10 7 14 12 8 0"),
+          (16, "1 2 3 7 10 6 4 12 9 5 8 15 13 11 0 14"),
+          (18, "1 3 4 8 5 7 10 0 13 9 2 15 14 6 11 12"),
+          (20, "1 11 2 7 3 4 6 8 9 5 12 0 13 14 10 15"),
+          (22, "10 5 3 1 6 11 2 4 9 14 13 8 15 7 12 0")]
+
+# Unavailable squares for the masked cases, the same every run
+def random_blocked(n, count, seed):
+    rnd = random.Random(seed)
+    return [(rnd.randint(1,n), rnd.randint(1,n)) for i in range(0,count)]
+
+# The n-queens and n-rooks cases: (name, solver, N, x, y, other unavailable squares)
+piece_cases = [("a0.solve_queens N=8 x=1 y=1", "solve_queens", 8, 1, 1, []),
+               ("a0.solve_queens N=12 x=2 y=3", "solve_queens", 12, 2, 3, []),
+               ("a0.solve_queens N=8 blocked=4", "solve_queens", 8, 1, 1, [(2,3),(5,5),(8,2)]),
+               ("a0.solve_rooks N=12 x=1 y=1", "solve_rooks", 12, 1, 1, []),
+               ("a0.solve_rooks N=30 blocked=40", "solve_rooks", 30, 0, 0, random_blocked(30,40,1)),
+               ("a0.solve_bitmask queens N=1000 x=5 y=7", "bitmask_queens", 1000, 5, 7, []),
+               ("a0.solve_bitmask queens N=150 blocked=1000", "bitmask_queens", 150, 0, 0, random_blocked(150,1000,1)),
+               ("a0.solve_bitmask rooks N=1000 x=1 y=1", "bitmask_rooks", 1000, 1, 1, []),
+               ("a0.solve_min_conflicts N=100000 x=5 y=7", "min_conflicts", 100000, 5, 7, []),
+               ("nrooks.solve N=16", "nrooks_solve", 16, 0, 0, []),
+               ("nrooks.solve_bfs N=6", "nrooks_bfs", 6, 0, 0, []),
+               ("nrooks.solve_bfs N=7", "nrooks_bfs", 7, 0, 0, [])]
+
+# All the cases as (name, job), a job is what run_case gets in the worker process
+def all_cases(pdb, time_limit):
+    cases = []
+    for search in sorted(solver16.searches):
+        for depth, board in boards:
+            cases.append(("solver16.%s depth=%d" % (search, depth),
+                          ("puzzle16", search, [int(num) for num in board.split()], depth, pdb, time_limit)))
+    for name, solver, n, x, y, blocked in piece_cases:
+        cases.append((name, ("pieces", solver, n, x, y, blocked)))
+    return cases
+
+
+# True when placement holds a piece in every row on an available square and no two pieces can take each other
+def valid_placement(placement, queens):
+    if placement is False or len(placement) != a0.N or len(set(placement)) != a0.N:
+        return False
+    if queens and (len(set(r + c for r, c in enumerate(placement))) != a0.N or
+                   len(set(r - c for r, c in enumerate(placement))) != a0.N):
+        return False
+    cells = a0.unavailable()
+    return not any((r, c) in cells for r, c in enumerate(placement))
+
+# Run one case in a worker process, returns its results as a dict
+def run_case(job):
+    stats = SearchStats()
+    result = {}
+    if job[0] == "puzzle16":
+        kind, search, board, depth, pdb, time_limit = job
+        if pdb is not None:
+            solver16.use_pattern_database(pdb)
+        rows = [board[i:i+4] for i in range(0,16,4)]
+        start = time.time()
+        try:
+            solution = solver16.searches[search](rows,solver16.goal_state,time_limit,stats)
+            result['wall_seconds'] = round(time.time() - start, 6)
+            result['status'] = 'ok' if (solution is not False and len(solution) == depth and
+                                        solver16.play_moves(rows, solution) == solver16.goal_state) else 'wrong'
+        except TimeLimitExceeded:
+            result['wall_seconds'] = round(time.time() - start, 6)
+            result['status'] = 'timeout'
+    else:
+        kind, solver, n, x, y, blocked = job
+        a0.N, a0.x, a0.y, a0.blocked = n, x, y, blocked
+        nrooks.N = n
+        queens = solver in ("solve_queens", "bitmask_queens", "min_conflicts")
+        empty = [[0] * n] * n
+        start = time.time()
+        if solver == "solve_queens":
+            placement = a0.solve_queens(empty,stats)
+        elif solver == "solve_rooks":
+            placement = a0.solve_rooks(empty,stats)
+        elif solver == "nrooks_solve":
+            placement = nrooks.solve(empty,stats)
+        elif solver == "nrooks_bfs":
+            placement = nrooks.solve_bfs(empty,stats)
+        elif solver == "min_conflicts":
+            placement = a0.solve_min_conflicts(1,stats=stats)
+        else:
+            placement = a0.solve_bitmask(queens,stats)
+        result['wall_seconds'] = round(time.time() - start, 6)
+        if placement and isinstance(placement[0], list):
+            placement = [row.index(1) for row in placement]
+        result['status'] = 'ok' if valid_placement(placement, queens) else 'wrong'
+    result['seconds'] = round(stats.seconds, 6)
+    result['expanded'] = stats.expanded
+    result['expanded_per_second'] = round(stats.expanded / stats.seconds, 1) if stats.seconds > 0 else None
+    result['peak_rss'] = stats.rss
+    return result
+
+# Run every case repeat times, each run in a fresh worker process, keep the fastest run and write a line
+# per case to output
+def run_cases(cases, repeat, output):
+    results = {}
+    for name, job in cases:
+        runs = []
+        for i in range(0,repeat):
+            pool = multiprocessing.Pool(1)
+            try:
+                runs.append(pool.apply(run_case, (job,)))
+            finally:
+                pool.terminate()
+                pool.join()
+        best = min(runs, key=lambda run: run['wall_seconds'])
+        best['runs'] = [run['wall_seconds'] for run in runs]
+        results[name] = best
+        output.write("%-45s %-7s %9.3fs %10d expanded %12s/s %8s MB\n" % (
+            name, best['status'], best['wall_seconds'], best['expanded'],
+            "%.0f" % best['expanded_per_second'] if best['expanded_per_second'] is not None else "-",
+            "%.1f" % (best['peak_rss'] / 1e6) if best['peak_rss'] is not None else "-"))
+        output.flush()
+    return results
+
+# Description of the machine and the settings of a run, saved with the results
+def environment(pdb, repeat):
+    return {'python': platform.python_version(), 'platform': platform.platform(), 'numpy': np.__version__,
+            'cpus': multiprocessing.cpu_count(), 'heuristic': 'pdb' if pdb is not None else 'manhattan',
+            'repeat': repeat, 'date': time.strftime("%Y-%m-%d %H:%M:%S")}
+
+
+# Compare two results, returns the list of regressions as strings and writes a line per common case to output.
+# Times shorter than min_seconds in both results are too noisy to compare and are left out.
+def compare(old, new, threshold, min_seconds, output):
+    regressions = []
+    if old['environment'].get('heuristic') != new['environment'].get('heuristic'):
+        output.write("warning: the runs use different heuristics, %s and %s\n" % (
+            old['environment'].get('heuristic'), new['environment'].get('heuristic')))
+    for name in sorted(set(old['cases']) & set(new['cases'])):
+        before, after = old['cases'][name], new['cases'][name]
+        changes = []
+        for metric in ('wall_seconds', 'expanded', 'peak_rss'):
+            if metric == 'wall_seconds' and max(before[metric], after[metric]) < min_seconds:
+                continue
+            if before.get(metric) and after.get(metric) is not None:
+                change = float(after[metric]) / before[metric] - 1
+                changes.append("%s %+.1f%%" % (metric, 100 * change))
+                if change > threshold:
+                    regressions.append("%s: %s went from %s to %s" % (name, metric, before[metric], after[metric]))
+        if before['status'] == 'ok' and after['status'] != 'ok':
+            regressions.append("%s: status went from ok to %s" % (name, after['status']))
+        output.write("%-45s %s\n" % (name, ", ".join(changes)))
+    for name in sorted(set(old['cases']) - set(new['cases'])):
+        output.write("%-45s only in the old results\n" % name)
+    return regressions
+
+def read_results(filename):
+    results_file = open(filename)
+    results = json.load(results_file)
+    results_file.close()
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the 16 puzzle, n-rooks and n-queens solvers")
+    parser.add_argument("--output", metavar="FILE", help="write the results to FILE as JSON")
+    parser.add_argument("--baseline", metavar="FILE", help="compare the results with an earlier results file")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="compare two results files without running")
+    parser.add_argument("--threshold", type=float, default=0.1,
+                        help="growth, as a fraction, of the time, nodes expanded or peak memory of a case that "
+                             "counts as a regression (default %(default)s)")
+    parser.add_argument("--min-seconds", type=float, default=0.05,
+                        help="times shorter than this in both runs are not compared (default %(default)s)")
+    parser.add_argument("--repeat", type=int, default=3, help="runs of every case, the fastest is kept (default %(default)s)")
+    parser.add_argument("--cases", metavar="TEXT", help="only run the cases whose name contains TEXT")
+    parser.add_argument("--pdb", default=pdb16.default_file,
+                        help="pattern database built by pdb16.py, the manhattan distance is used if the file does not exist")
+    parser.add_argument("--time-limit", type=float, default=60,
+                        help="give up on a 16 puzzle case after this many seconds (default %(default)s)")
+    args = parser.parse_args()
+
+    if args.compare:
+        old, new = read_results(args.compare[0]), read_results(args.compare[1])
+    else:
+        pdb = args.pdb if os.path.exists(args.pdb) else None
+        cases = [(name, job) for name, job in all_cases(pdb, args.time_limit) if args.cases is None or args.cases in name]
+        new = {'environment': environment(pdb, args.repeat), 'cases': run_cases(cases, args.repeat, sys.stdout)}
+        if args.output:
+            output = open(args.output, "w")
+            json.dump(new, output, indent=2, sort_keys=True)
+            output.write("\n")
+            output.close()
+        old = read_results(args.baseline) if args.baseline else None
+        if any(result['status'] != 'ok' for result in new['cases'].values()):
+            print ("Some cases did not pass their check")
+
+    if old is not None:
+        regressions = compare(old, new, args.threshold, args.min_seconds, sys.stdout)
+        for regression in regressions:
+            print ("REGRESSION " + regression)
+        if regressions:
+            sys.exit(1)
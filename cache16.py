@@ -0,0 +1,160 @@
+#!/usr/bin/env python
+# cache16.py : Cache of solved 16 puzzle boards kept on disk between runs of solver16.py
+#
+# Every board on an optimal solution is stored with its distance to the goal and the code of the first
+# move of an optimal solution from it, so a board met before, as a start or anywhere along an earlier
+# solution, is solved by following the moves (solver16.cached_path). solver16.solve() also uses the
+# distances as exact heuristic values.
+#
+# The cache holds at most size boards. Every use of a board stamps it with the cache's clock, which
+# goes up by one for each solution looked up or stored, and when the cache is saved only the most
+# recently used boards are kept. The boards of one solution are stamped together, so they are kept
+# or dropped together.
+#
+# The saved boards are memory mapped from the file and found with a binary search, like the layers of
+# gen16.py, so worker processes that load the same file share its pages. A bitmap of 2**filter_bits
+# bits, with the bit picked by a hash of every board in the cache set, rules out most other boards
+# before any lookup. Only that bitmap, the boards added since the cache was loaded and the stamps of
+# saved boards used since then are held in memory. Once there are overlay_size added and stamped boards
+# the cache is saved and mapped again, or for a cache that is only read, such as the copy of a batch
+# worker, they are dropped.
+#
+# File layout: a 16 byte header, then the clock and the number of boards as 8 byte integers, then a
+# column per field with one entry for every board: the packed boards in increasing order as 8 byte
+# integers, their stamps as 4 byte integers, their distances and their move codes as bytes.
+# That is 14 bytes per board.
+
+import os
+import numpy as np
+
+header = b'CACHE16\x00\x04\x04\x02\x03\x00\x00\x00\x00'
+columns = ('<u8', '<u4', 'u1', 'u1')
+default_size = 1000000
+# Boards added or stamped since the cache was loaded that are held in memory before it is saved
+overlay_size = 65536
+# The bitmap of the saved boards has 2**filter_bits bits, picked by the top bits of the board times multiplier
+filter_bits = 23
+multiplier = 0x9E3779B97F4A7C15
+# Move code of the goal, which has no move
+no_move = 255
+
+# Bit of the bitmap of a packed board
+def filter_bit(state):
+    return (state * multiplier & 0xFFFFFFFFFFFFFFFF) >> (64 - filter_bits)
+
+
+class SolutionCache(object):
+    # Load the cache saved in filename if there is one. A cache that is not writable never saves itself.
+    def __init__(self, filename, size=default_size, writable=True):
+        self.filename = filename
+        self.size = size
+        self.writable = writable
+        self.clock = 0
+        # The saved boards, sorted, and their stamps, distances and move codes
+        self.states, self.saved_stamps, self.distances, self.moves = [np.zeros(0, dtype=c) for c in columns]
+        self.filter = bytearray(1 << (filter_bits - 3))
+        # Index of a saved board -> stamp, for the saved boards used since loading
+        self.stamps = {}
+        # Packed board -> [distance, move code, stamp], for the boards added since loading
+        self.added = {}
+        if os.path.exists(filename):
+            self.load()
+
+    def __len__(self):
+        return len(self.states) + len(self.added)
+
+    def load(self):
+        data = np.asarray(np.memmap(self.filename, dtype=np.uint8, mode='r'))
+        start = len(header) + 16
+        if len(data) < start or data[:len(header)].tobytes() != header:
+            raise ValueError(self.filename + " is not a cache written by cache16.py")
+        clock, count = data[len(header):start].view('<u8').tolist()
+        if len(data) != start + count*sum(np.dtype(c).itemsize for c in columns):
+            raise ValueError(self.filename + " is not a cache written by cache16.py")
+        fields = []
+        for column in columns:
+            end = start + count*np.dtype(column).itemsize
+            fields.append(data[start:end].view(column))
+            start = end
+        self.states, self.saved_stamps, self.distances, self.moves = fields
+        bits = np.zeros(1 << filter_bits, dtype=bool)
+        bits[(self.states * np.uint64(multiplier)) >> np.uint64(64 - filter_bits)] = True
+        self.filter = bytearray(np.packbits(bits, bitorder='little').tobytes())
+        self.clock = max(self.clock, clock)
+        self.stamps = {}
+        self.added = {}
+
+    # Write the most recently used boards, up to size of them, to a new file that then replaces the old
+    # one, and map the new file
+    def save(self):
+        stamps = np.array(self.saved_stamps, dtype='<u4')
+        if self.stamps:
+            stamps[list(self.stamps.keys())] = list(self.stamps.values())
+        added = list(self.added.items())
+        states = np.concatenate([self.states, np.array([state for state, value in added], dtype='<u8')])
+        stamps = np.concatenate([stamps, np.array([value[2] for state, value in added], dtype='<u4')])
+        distances = np.concatenate([self.distances, np.array([value[0] for state, value in added], dtype='u1')])
+        moves = np.concatenate([self.moves, np.array([value[1] for state, value in added], dtype='u1')])
+        keep = np.argsort(stamps, kind='stable')[::-1][:self.size]
+        keep = keep[np.argsort(states[keep])]
+        temporary = self.filename + '.tmp'
+        output = open(temporary, 'wb')
+        output.write(header)
+        output.write(np.array([self.clock, len(keep)], dtype='<u8').tobytes())
+        for field in (states, stamps, distances, moves):
+            output.write(field[keep].tobytes())
+        output.close()
+        # Drop the mapping of the old file before it is replaced
+        self.states, self.saved_stamps, self.distances, self.moves = [np.zeros(0, dtype=c) for c in columns]
+        getattr(os, 'replace', os.rename)(temporary, self.filename)
+        self.load()
+
+    # Start a new use of the cache, the boards used from now on get the new stamp
+    def tick(self):
+        self.clock += 1
+        if len(self.added) + len(self.stamps) >= overlay_size:
+            if self.writable:
+                self.save()
+            else:
+                self.stamps = {}
+                self.added = {}
+
+    # Index of a packed board among the saved boards, None when it is not one of them
+    def find(self, state):
+        i = int(self.states.searchsorted(np.uint64(state)))
+        if i < len(self.states) and int(self.states[i]) == state:
+            return i
+        return None
+
+    # Distance to the goal of a packed board, None when it is not in the cache.
+    # The searches call this for every board they generate, most boards are ruled out by the bitmap.
+    def distance(self, state):
+        bit = filter_bit(state)
+        if not self.filter[bit >> 3] >> (bit & 7) & 1:
+            return None
+        entry = self.added.get(state)
+        if entry is not None:
+            return entry[0]
+        i = self.find(state)
+        return int(self.distances[i]) if i is not None else None
+
+    # (distance, move code) of a packed board, None when it is not in the cache. The board is stamped.
+    def get(self, state):
+        entry = self.added.get(state)
+        if entry is not None:
+            entry[2] = self.clock
+            return entry[0], entry[1]
+        i = self.find(state)
+        if i is None:
+            return None
+        self.stamps[i] = self.clock
+        return int(self.distances[i]), int(self.moves[i])
+
+    def put(self, state, distance, move):
+        i = self.find(state)
+        if i is not None:
+            self.stamps[i] = self.clock
+        else:
+            self.added[state] = [distance, move, self.clock]
+            bit = filter_bit(state)
+            self.filter[bit >> 3] |= 1 << (bit & 7)
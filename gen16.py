@@ -0,0 +1,173 @@
+#!/usr/bin/env python
+# gen16.py : Generate 16 puzzle boards with a known optimal number of moves
+#
+# Usage: python gen16.py build [--depth D] [--dir DIR]
+#        python gen16.py sample --depth D [--count K] [--seed S] [--dir DIR]
+#        python gen16.py depth BOARD_FILE... [--dir DIR]
+#        python gen16.py verify [--search astar] [--count K] [--seed S] [--pdb FILE] [--time-limit SECONDS] [--dir DIR]
+#
+# build runs a breadth first search backwards from the goal with the moves of solver16.py, one to three
+# tiles shifted into the blank. Every move can be undone by a move of as many tiles the other way, so
+# the boards first reached after d moves back from the goal are exactly the boards whose optimal
+# solution takes d moves. The layers are stored in DIR (default solver16.layers next to this script)
+# as numpy files of sorted packed boards, 8 bytes per board, and build carries on from the deepest
+# layer already there. A layer is only ever reached from the layer before it, itself and the one after
+# it, so only the last two layers are needed to find the next one. Each layer is about 2.8 times the
+# size of the one before: depth 12 holds 0.8 million boards and depth 14 about 6 million.
+#
+# sample prints boards picked at random from a layer, one per line as the 16 numbers in row order,
+# which is the file format solver16.py --batch reads.
+# depth looks boards up in the layers, which are memory mapped, and prints their optimal number of moves.
+# verify solves boards from every layer with a search of solver16.py and checks that the solutions are
+# valid and have the optimal number of moves.
+
+import os
+import sys
+import time
+import argparse
+import numpy as np
+import pdb16
+import solver16
+from searchstats import SearchStats
+from solver16 import TimeLimitExceeded
+
+default_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'solver16.layers')
+
+# Boards are expanded this many at a time to bound the memory of the successor arrays
+chunk = 1 << 20
+
+
+def layer_file(directory, depth):
+    return os.path.join(directory, 'depth-%02d.npy' % depth)
+
+# Cell of the blank of each packed board
+def blank_cells(states):
+    blanks = np.zeros(len(states), dtype=np.int64)
+    for p in range(0,16):
+        blanks[((states >> np.uint64(4*p)) & np.uint64(15)) == 0] = p
+    return blanks
+
+# All the boards one move away from the boards in states, sorted and without repeats
+def neighbours(states):
+    keep, mask, right, left, blank, code, valid = solver16.move_block[:7]
+    found = []
+    for i in range(0,len(states),chunk):
+        boards = states[i:i+chunk]
+        blanks = blank_cells(boards)
+        boards = boards[:,None]
+        children = (boards & keep[blanks]) | ((boards & mask[blanks]) >> right[blanks] << left[blanks])
+        found.append(np.unique(children[valid[blanks]]))
+    return np.unique(np.concatenate(found)) if found else np.array([], dtype=np.uint64)
+
+# The boards of states, which is sorted, that are not in the sorted array layer
+def not_in(states, layer):
+    if len(layer) == 0:
+        return states
+    index = np.minimum(np.searchsorted(layer, states), len(layer) - 1)
+    return states[layer[index] != states]
+
+# Write the layers up to depth to directory, starting from the deepest layer already there
+def build(directory, depth):
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    layers = load(directory)
+    if not layers:
+        layers = [np.array([solver16.goal], dtype=np.uint64)]
+        np.save(layer_file(directory, 0), layers[0])
+    previous = layers[-2] if len(layers) > 1 else np.array([], dtype=np.uint64)
+    current = np.asarray(layers[-1])
+    for d in range(len(layers),depth+1):
+        start = time.time()
+        following = not_in(not_in(neighbours(current), current), previous)
+        np.save(layer_file(directory, d), following)
+        print ("depth %d: %d boards in %.1fs" % (d, len(following), time.time() - start))
+        previous, current = current, following
+
+# Memory map the layers found in directory, layer d holds the boards d moves from the goal
+def load(directory):
+    layers = []
+    while os.path.exists(layer_file(directory, len(layers))):
+        layers.append(np.load(layer_file(directory, len(layers)), mmap_mode='r'))
+    return layers
+
+# Optimal number of moves of a board, None when it is deeper than the layers
+def depth_of(board, layers):
+    state = np.uint64(solver16.pack(board)[0])
+    for d, layer in enumerate(layers):
+        i = np.searchsorted(layer, state)
+        if i < len(layer) and layer[i] == state:
+            return d
+    return None
+
+# count boards picked at random from layer d, as lists of rows
+def sample(layers, d, count, seed=None):
+    layer = layers[d]
+    rnd = np.random.RandomState(seed)
+    picks = rnd.choice(len(layer), min(count, len(layer)), replace=False)
+    return [solver16.unpack(int(layer[i])) for i in sorted(picks)]
+
+# Solve count boards of every layer with a search of solver16.py and check the solutions, prints a line
+# per layer and returns the number of boards whose solution is not optimal or not valid
+def verify(layers, search, count, seed, time_limit, output):
+    wrong = 0
+    for d in range(0,len(layers)):
+        solved = timeouts = bad = 0
+        stats = SearchStats()
+        expanded = 0
+        start = time.time()
+        for board in sample(layers, d, count, seed):
+            try:
+                solution = solver16.searches[search](board,solver16.goal_state,time_limit,stats)
+            except TimeLimitExceeded:
+                timeouts += 1
+                continue
+            expanded += stats.expanded
+            if solution is False or len(solution) != d or solver16.play_moves(board, solution) != solver16.goal_state:
+                bad += 1
+                output.write("depth %d: wrong solution %s for %s\n" % (
+                    d, " ".join(solution) if solution else solution, " ".join(str(num) for num in sum(board, []))))
+            else:
+                solved += 1
+        wrong += bad
+        output.write("depth %d: %d optimal, %d wrong, %d timed out, %d expanded, %.2fs\n" % (
+            d, solved, bad, timeouts, expanded, time.time() - start))
+        output.flush()
+    return wrong
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate 16 puzzle boards by their optimal number of moves")
+    parser.add_argument("command", choices=["build", "sample", "depth", "verify"])
+    parser.add_argument("boards", nargs="*", help="board files for the depth command")
+    parser.add_argument("--dir", default=default_dir, help="directory of the layers (default solver16.layers)")
+    parser.add_argument("--depth", type=int, help="deepest layer to build, or the layer to sample from")
+    parser.add_argument("--count", type=int, default=10, help="boards to sample, or to verify per layer (default %(default)s)")
+    parser.add_argument("--seed", type=int, help="random seed for sample and verify")
+    parser.add_argument("--search", choices=sorted(solver16.searches), default="astar", help="search to verify")
+    parser.add_argument("--pdb", default=pdb16.default_file,
+                        help="pattern database built by pdb16.py, the manhattan distance is used if the file does not exist")
+    parser.add_argument("--time-limit", type=float, default=None, help="give up on a board to verify after this many seconds")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        build(args.dir, args.depth if args.depth is not None else 14)
+        sys.exit(0)
+    layers = load(args.dir)
+    if not layers:
+        parser.error("no layers in %s, run build first" % args.dir)
+    if args.command == "sample":
+        if args.depth is None or not 0 <= args.depth < len(layers):
+            parser.error("--depth must be a layer from 0 to %d" % (len(layers) - 1))
+        for board in sample(layers, args.depth, args.count, args.seed):
+            print (" ".join(str(num) for num in sum(board, [])))
+    elif args.command == "depth":
+        for filename in args.boards:
+            board_file = open(filename)
+            board = [[int(num) for num in line.split()] for line in board_file if line.strip()]
+            board_file.close()
+            d = depth_of(board, layers)
+            print ("%s: %s" % (filename, d if d is not None else "more than %d moves" % (len(layers) - 1)))
+    else:
+        if os.path.exists(args.pdb):
+            solver16.use_pattern_database(args.pdb)
+        sys.exit(1 if verify(layers, args.search, args.count, args.seed, args.time_limit, sys.stdout) else 0)
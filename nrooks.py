@@ -7,7 +7,16 @@
 # The N-rooks problem is: Given an empty NxN chessboard, place N rooks on the board so that no rooks
 # can take any other, i.e. such that no two rooks share the same row or column.
 
-import sys
+import argparse
+import tempfile
+from collections import deque
+from searchstats import SearchStats
+
+# The stats of a search are only updated every so many expanded boards
+check_interval = 1024
+
+# Number of boards the breadth first search keeps in memory before the rest of its fringe goes to disk
+frontier_limit = 1000000
 
 
 # Count # of pieces in given row
@@ -62,34 +71,160 @@ def is_goal(board):
            all([count_on_col(board, c) <= 1 for c in range(0, N)])
 
 
-# Solve n-rooks!
-def solve(initial_board):
-    fringe = [initial_board]
-    while len(fringe) > 0:
-        for s in successors2(fringe.pop()):
-            if is_goal(s):
-                return (s)
-            fringe.append(s)
-    return False
-
-# Added function to Solve n-rooks Using BFS!
-def solve_bfs(initial_board):
+# Depth first search, boards are taken from the end of the fringe
+# stats is an optional SearchStats that gets the counters of the search.
+# The depth is the number of rooks on the board, it is only counted when the stats are updated.
+def search(initial_board,stats):
     fringe = [initial_board]
-    while len(fringe) > 0:
-        for s in successors2(fringe.pop(0)):
-            if is_goal(s):
-                return (s)
-            fringe.append(s)
-    return False
+    expanded = generated = depth = 0
+    timing = stats is not None and stats.timing
+    if stats is not None:
+        stats.begin()
+    expand = stats.timed('successors', successors2) if timing else successors2
+    goal = stats.timed('goal test', is_goal) if timing else is_goal
+    try:
+        while len(fringe) > 0:
+            board = fringe.pop()
+            expanded += 1
+            if stats is not None and expanded % check_interval == 0:
+                depth = max(depth, count_pieces(board))
+                stats.update(generated,expanded,0,len(fringe),0,depth)
+            for s in expand(board):
+                generated += 1
+                if goal(s):
+                    depth = N
+                    return (s)
+                fringe.append(s)
+        return False
+    finally:
+        if stats is not None:
+            stats.finish(generated,expanded,0,len(fringe),0,depth)
 
-
-# This is N, the size of the board. It is passed through command line arguments.
-N = int(sys.argv[1])
-
-
-# The board is stored as a list-of-lists. Each inner list is a row of the board.
-# A zero in a given square indicates no piece, and a 1 indicates a piece.
-initial_board = [[0] * N] * N
-print ("Starting from initial board:\n" + printable_board(initial_board) + "\n\nLooking for solution...\n")
-solution = solve(initial_board)
-print (printable_board(solution) if solution else "Sorry, no solution found. :(")
+# Solve n-rooks!
+def solve(initial_board,stats=None):
+    return search(initial_board,stats)
+
+# Breadth first search
+# A board is kept as a key of one byte per row: 0 for an empty row, else the column of its rook plus 1.
+# A rook is only ever added to the first empty row, so every board is built in one order of its rows
+# and reached only once, without keeping the boards seen so far: the memory of the search is the
+# fringe, and the part of it past the limit is on disk.
+
+# Key of a board
+def board_key(board):
+    return bytes(bytearray(row.index(1) + 1 if 1 in row else 0 for row in board))
+
+# Board of a key
+def key_board(key):
+    return [[1 if c + 1 == k else 0 for c in range(0,N)] for k in bytearray(key)]
+
+# FIFO queue of keys that holds up to limit keys in memory. Keys pushed while it is full are written
+# to a temporary file and read back, limit at a time, once the keys in memory have been taken.
+class SpillQueue(object):
+    def __init__(self, limit, size):
+        self.limit = limit
+        self.size = size
+        self.memory = deque()
+        self.disk = None
+        self.on_disk = 0
+
+    def __len__(self):
+        return len(self.memory) + self.on_disk
+
+    def push(self, key):
+        if self.on_disk == 0 and len(self.memory) < self.limit:
+            self.memory.append(key)
+            return
+        if self.disk is None:
+            self.disk = tempfile.TemporaryFile()
+            self.read_at = self.write_at = 0
+        self.disk.seek(self.write_at)
+        self.disk.write(key)
+        self.write_at += self.size
+        self.on_disk += 1
+
+    def pop(self):
+        if not self.memory:
+            count = min(self.limit, self.on_disk)
+            self.disk.seek(self.read_at)
+            data = self.disk.read(count * self.size)
+            self.read_at += count * self.size
+            self.on_disk -= count
+            self.memory.extend(data[i:i + self.size] for i in range(0, len(data), self.size))
+            if self.on_disk == 0:
+                self.disk.truncate(0)
+                self.read_at = self.write_at = 0
+        return self.memory.popleft()
+
+    def close(self):
+        if self.disk is not None:
+            self.disk.close()
+
+# Solve n-rooks Using BFS!
+# limit is the number of boards of the fringe kept in memory, frontier_limit when not given.
+def solve_bfs(initial_board,stats=None,limit=None):
+    key = board_key(initial_board)
+    rooks = N - key.count(b'\x00')
+    if rooks == N:
+        return initial_board
+    fringe = SpillQueue(limit or frontier_limit, N)
+    fringe.push(key)
+    level = rooks
+    expanded = generated = 0
+    if stats is not None:
+        stats.begin()
+    try:
+        while len(fringe) > 0:
+            key = fringe.pop()
+            rooks = N - key.count(b'\x00')
+            level = rooks
+            expanded += 1
+            if stats is not None and expanded % check_interval == 0:
+                stats.update(generated,expanded,0,len(fringe),0,level)
+            board = bytearray(key)
+            used = set(board)
+            r = key.index(b'\x00')
+            for c in range(1,N+1):
+                if c in used:
+                    continue
+                board[r] = c
+                s = bytes(board)
+                generated += 1
+                if rooks + 1 == N:
+                    level = N
+                    return key_board(s)
+                fringe.push(s)
+        return False
+    finally:
+        fringe.close()
+        if stats is not None:
+            stats.finish(generated,expanded,0,len(fringe),0,level)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Solve the N-rooks problem")
+    parser.add_argument("N", type=int, help="size of the board, N")
+    parser.add_argument("--bfs", action="store_true", help="use breadth first search instead of depth first search")
+    parser.add_argument("--frontier-limit", type=int, default=frontier_limit, metavar="BOARDS",
+                        help="boards of the breadth first search fringe kept in memory, the rest go to a "
+                             "temporary file (default %(default)s)")
+    parser.add_argument("--stats-json", metavar="FILE", help="write the counters of the search to FILE as JSON")
+    parser.add_argument("--progress", type=float, metavar="SECONDS",
+                        help="print a progress line to stderr every SECONDS seconds")
+    parser.add_argument("--phase-times", action="store_true",
+                        help="time the phases of the search for --stats-json, this slows the search down")
+    args = parser.parse_args()
+
+    # This is N, the size of the board. It is passed through command line arguments.
+    N = args.N
+
+
+    # The board is stored as a list-of-lists. Each inner list is a row of the board.
+    # A zero in a given square indicates no piece, and a 1 indicates a piece.
+    initial_board = [[0] * N] * N
+    stats = SearchStats(args.phase_times,args.progress)
+    print ("Starting from initial board:\n" + printable_board(initial_board) + "\n\nLooking for solution...\n")
+    solution = solve_bfs(initial_board,stats,args.frontier_limit) if args.bfs else solve(initial_board,stats)
+    print (printable_board(solution) if solution else "Sorry, no solution found. :(")
+    if args.stats_json:
+        stats.write_json(args.stats_json)
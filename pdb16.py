@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+# pdb16.py : Build the pattern database heuristic used by solver16.py
+#
+# Usage: python pdb16.py [output file]   (default: solver16.pdb next to this script)
+#
+# The 15 tiles are split into three disjoint groups of 5 consecutive tiles, 1-5, 6-10 and 11-15.
+# For each group the database stores, for every placement of the group's tiles on the board,
+# the minimum cost of bringing the group's tiles home when the other tiles are indistinguishable.
+#
+# Admissibility under the 1, 2 or 3 tile shifts of solver16.py:
+# the cost of every move is split evenly over the tiles it shifts, so a move of k tiles charges
+# 1/k to each of them and moves that shift no tile of a group cost that group nothing.
+# The groups are disjoint, so the shares charged to the three groups for one move add up to at
+# most 1, and the sum of the three database values never exceeds the number of moves of a
+# solution. The heuristic is the sum rounded up to a whole number of moves.
+#
+# File layout: an 8 byte header followed by one table per group. A table has 2**20 entries of
+# one byte holding the cost in sixths of a move, indexed by the cells of the group's tiles packed
+# 4 bits per tile in tile order, which is the same layout solver16.py uses to track each tile.
+# The file is memory mapped read only by the solver, so several solver processes share one copy.
+
+import os
+import sys
+import mmap
+import numpy as np
+
+header = b'PDB16\x00\x06\x03'
+groups = [[1,2,3,4,5],[6,7,8,9,10],[11,12,13,14,15]]
+table_size = 1 << 20
+default_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'solver16.pdb')
+goal_state = [[1,2,3,4],[5,6,7,8],[9,10,11,12],[13,14,15,0]]
+
+
+# Cell reached from every cell of the board after k steps in each direction, -1 off the board
+# reach[d][k] holds the cells for direction d and k steps, next to the step in cell numbers
+def build_reach():
+    reach = []
+    for step, dr, dc in ((1,0,1), (-1,0,-1), (4,1,0), (-4,-1,0)):
+        cells = [None]
+        for k in range(1,4):
+            cells.append(np.array([p + k*step if 0 <= p//4 + k*dr < 4 and 0 <= p%4 + k*dc < 4 else -1
+                                   for p in range(0,16)], dtype=np.int64))
+        reach.append((step, cells))
+    return reach
+
+
+# Dijkstra search backwards from the goal over (group tile cells, blank cell) states.
+# A state is packed as the group's cells 4 bits per tile with the blank cell above them.
+# A move shifts the k tiles next to the blank along a row or column, exactly like solver16.py.
+# The other tiles are indistinguishable, but every cell the blank passes over holds a tile,
+# so the cost of one move can be split evenly over the k tiles it moves: each tile of the
+# group pays 1/k of the move. Costs are counted in sixths so they stay integers, which makes
+# a move cost 0, 2, 3, 4 or 6. Moves that shift no tile of the group are free, so each cost
+# level is first closed under the free moves and then expanded by the paid ones.
+def build_table(group):
+    tiles = len(group)
+    cell_mask = (1 << (4*tiles)) - 1
+    reach = build_reach()
+    goal_cells = dict((goal_state[i][j], 4*i + j) for i in range(0,4) for j in range(0,4))
+
+    start = goal_cells[0] << (4*tiles)
+    for i, k in enumerate(group):
+        start |= goal_cells[k] << (4*i)
+
+    done = np.zeros(16 << (4*tiles), dtype=bool)
+    table = np.full(table_size, 255, dtype=np.uint8)
+    buckets = {0: [np.array([start], dtype=np.int64)]}
+    while buckets:
+        cost = min(buckets)
+        frontier = np.unique(np.concatenate(buckets.pop(cost)))
+        frontier = frontier[~done[frontier]]
+        level = []
+        while len(frontier) > 0:
+            done[frontier] = True
+            level.append(frontier)
+            blank = frontier >> (4*tiles)
+            free = []
+            for step, cells in reach:
+                for k in range(1,4):
+                    target = cells[k][blank]
+                    valid = target >= 0
+                    states, target, blank_from = frontier[valid], target[valid], blank[valid]
+                    # A tile of the group moves if it lies between the blank and the target cell
+                    moved = states & cell_mask
+                    hits = np.zeros(len(states), dtype=np.int64)
+                    for i in range(0,tiles):
+                        cell = (states >> (4*i)) & 15
+                        on_line = ((cell - blank_from) % step == 0) if abs(step) == 4 else (cell // 4 == blank_from // 4)
+                        on_line &= (cell - blank_from) * np.sign(step) > 0
+                        on_line &= (cell - target) * np.sign(step) <= 0
+                        moved = moved - on_line * (step << (4*i))
+                        hits = hits + on_line
+                    moved = moved | (target << (4*tiles))
+                    free.append(moved[hits == 0])
+                    for n in range(1,k+1):
+                        paid = moved[hits == n]
+                        if len(paid) > 0:
+                            buckets.setdefault(cost + 6*n//k, []).append(paid)
+            frontier = np.unique(np.concatenate(free))
+            frontier = frontier[~done[frontier]]
+        if len(level) == 0:
+            continue
+        level = np.concatenate(level) & cell_mask
+        level = level[table[level] == 255]
+        table[level] = cost
+    return table
+
+
+def build(filename):
+    output = open(filename, 'wb')
+    output.write(header)
+    for group in groups:
+        print ("Building table for tiles " + " ".join(str(k) for k in group))
+        output.write(build_table(group).tobytes())
+    output.close()
+
+
+# Memory map a database built by build(), the tables start right after the header
+def load(filename):
+    pdb_file = open(filename, 'rb')
+    pdb = mmap.mmap(pdb_file.fileno(), 0, access=mmap.ACCESS_READ)
+    pdb_file.close()
+    if pdb[:len(header)] != header or len(pdb) != len(header) + len(groups)*table_size:
+        raise ValueError(filename + " is not a pattern database built by pdb16.py")
+    return pdb
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 2:
+        print ("Please pass the output file as the only argument")
+    else:
+        build(sys.argv[1] if len(sys.argv) == 2 else default_file)
@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+# searchstats.py : Counters and timings for the searches in solver16.py, a0.py and nrooks.py
+#
+# Every search takes an optional SearchStats. The search keeps its counters in local variables and
+# only copies them here every so many expanded nodes and when it ends, so the counters cost close to
+# nothing. Timing the phases of a search wraps the functions it calls and printing progress lines
+# needs the clock, so both are only done when they are asked for.
+
+import sys
+import time
+import json
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+# Peak resident memory of this process in bytes, None where the resource module is missing
+def peak_rss():
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return rss if sys.platform == 'darwin' else rss * 1024
+
+
+class SearchStats(object):
+    # timing - measure the time spent in each phase of the search
+    # progress - print a progress line to output every so many seconds
+    def __init__(self, timing=False, progress=None, output=sys.stderr):
+        self.timing = timing
+        self.progress = progress
+        self.output = output
+        self.generated = 0
+        self.expanded = 0
+        self.duplicates = 0
+        self.max_open = 0
+        self.max_closed = 0
+        self.max_depth = 0
+        self.phases = {}
+        self.nested = 0.0
+        self.seconds = 0.0
+        self.rss = None
+        self.begin()
+
+    # Called when a search starts, the time of the search and the progress lines count from here
+    def begin(self):
+        self.started = time.time()
+        self.next_progress = self.started + self.progress if self.progress else None
+
+    # Add seconds spent in a phase of the search
+    def add_time(self, phase, seconds):
+        self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+    # Phases can be nested, the time of a phase does not include the phases timed inside it.
+    # start_phase returns a token to pass to end_phase along with the name of the phase.
+    def start_phase(self):
+        return (time.time(), self.nested)
+
+    def end_phase(self, phase, token):
+        start, nested = token
+        elapsed = time.time() - start
+        self.add_time(phase, elapsed - (self.nested - nested))
+        self.nested = nested + elapsed
+
+    # Return function wrapped so the time spent in it is added to phase
+    def timed(self, phase, function):
+        def timed_function(*args):
+            token = self.start_phase()
+            try:
+                return function(*args)
+            finally:
+                self.end_phase(phase, token)
+        return timed_function
+
+    # Called by the searches every so many expanded nodes with their current counters
+    def update(self, generated, expanded, duplicates, open_size, closed_size, depth):
+        self.generated = generated
+        self.expanded = expanded
+        self.duplicates = duplicates
+        self.max_open = max(self.max_open, open_size)
+        self.max_closed = max(self.max_closed, closed_size)
+        self.max_depth = max(self.max_depth, depth)
+        if self.next_progress is not None:
+            now = time.time()
+            if now >= self.next_progress:
+                self.next_progress = now + self.progress
+                self.output.write(self.progress_line(now) + "\n")
+                self.output.flush()
+
+    def progress_line(self, now):
+        seconds = now - self.started
+        return "%.1fs expanded %d generated %d (%.0f/s) open %d closed %d depth %d" % (
+            seconds, self.expanded, self.generated, self.expanded / seconds if seconds > 0 else 0,
+            self.max_open, self.max_closed, self.max_depth)
+
+    # Called once when the search ends
+    def finish(self, generated, expanded, duplicates, open_size, closed_size, depth):
+        self.next_progress = None
+        self.update(generated, expanded, duplicates, open_size, closed_size, depth)
+        self.seconds = time.time() - self.started
+        self.rss = peak_rss()
+        if self.timing:
+            self.add_time('other', max(0.0, self.seconds - sum(self.phases.values())))
+
+    def as_dict(self):
+        return {'generated': self.generated, 'expanded': self.expanded, 'duplicates': self.duplicates,
+                'max_open': self.max_open, 'max_closed': self.max_closed, 'max_depth': self.max_depth,
+                'seconds': round(self.seconds, 6),
+                'expanded_per_second': round(self.expanded / self.seconds, 1) if self.seconds > 0 else None,
+                'peak_rss': self.rss, 'phases': dict((phase, round(seconds, 6)) for phase, seconds in self.phases.items())}
+
+    def write_json(self, filename):
+        output = open(filename, 'w')
+        json.dump(self.as_dict(), output, indent=2, sort_keys=True)
+        output.write("\n")
+        output.close()
@@ -0,0 +1,230 @@
+#!/usr/bin/env python
+# service.py : Long running solver service for the 16 puzzle, n-rooks and n-queens
+#
+# Usage: python service.py [--socket PATH] [--workers N] [--pdb FILE] [--time-limit SECONDS]
+#
+# Starting a solver script costs the interpreter, numpy, the move tables of solver16.py and the
+# pattern database for every board. The service starts a pool of worker processes once, each of
+# which imports the solvers and maps the pattern database, and then hands every request to a free
+# worker, so a request only costs its search.
+#
+# Requests and responses are JSON objects, one per line. They are read from stdin and written to
+# stdout, or with --socket read from and written to every connection to a Unix socket at PATH.
+# Responses are written as the searches finish, so they can come back in a different order than the
+# requests: the "id" of a request, which can be anything, is copied to its response.
+#
+# Requests:
+#   {"id": 1, "problem": "puzzle16", "board": [[1,2,3,4],...,[13,14,15,0]], "search": "astar"}
+#   {"id": 2, "problem": "nqueen", "n": 8, "x": 1, "y": 1, "blocked": [[2,3]], "engine": "bitmask"}
+#   {"id": 3, "problem": "nrook", "n": 6, "engine": "bfs"}
+# The board of a 16 puzzle can also be the 16 numbers in row order. search is astar, block or ida.
+# x, y and blocked are the unavailable squares, counted from 1 as in a0.py, and are optional.
+# The engines are those of a0.py, bitmask, dfs or minconflicts (nqueen only, with an optional "seed"),
+# and bfs for nrook, which is the breadth first search of nrooks.py.
+# Every request can set "time_limit" in seconds, the default is the --time-limit of the service.
+#
+# Responses have "id", "status" and "expanded" and "seconds" for the search. status is one of
+# solved, no solution, timeout, unsolvable (odd parity), invalid or error, the last two with a "error"
+# message. A solved 16 puzzle has "moves" and "cost", a solved n-rooks or n-queens board has "placement",
+# the column of the piece in each row counted from 1.
+
+import os
+import sys
+import json
+import signal
+import argparse
+import threading
+import multiprocessing
+try:
+    import socketserver
+except ImportError:
+    import SocketServer as socketserver
+import a0
+import pdb16
+import nrooks
+import solver16
+from searchstats import SearchStats
+from solver16 import TimeLimitExceeded
+
+
+# The searches of a0.py and nrooks.py have no time limit of their own, so the worker interrupts
+# them with a timer signal where the platform has one
+def interrupt(signum, frame):
+    raise TimeLimitExceeded()
+
+# Each worker process maps the pattern database once, the pages are shared between the workers.
+# Ctrl-C is left to the service, which stops the workers itself.
+def init_worker(pdb):
+    solver16.init_worker(pdb)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    if hasattr(signal, 'setitimer'):
+        signal.signal(signal.SIGALRM, interrupt)
+
+# Solve a 16 puzzle request, returns the fields of the response
+def solve_puzzle(request, time_limit, stats):
+    board = request['board']
+    if len(board) == 16 and all(not isinstance(row, list) for row in board):
+        board = [board[i:i+4] for i in range(0,16,4)]
+    if any(len(row) != 4 for row in board) or sorted(sum(board, [])) != list(range(0,16)):
+        raise ValueError("board must hold the numbers 0 to 15 in 4 rows of 4")
+    search = request.get('search', 'astar')
+    if search not in solver16.searches:
+        raise ValueError("search must be one of " + ", ".join(sorted(solver16.searches)))
+    if not solver16.is_solvable(board):
+        return {'status': 'unsolvable'}
+    solution = solver16.searches[search](board,solver16.goal_state,time_limit,stats)
+    if solution is False:
+        return {'status': 'no solution'}
+    return {'status': 'solved', 'moves': solution, 'cost': len(solution)}
+
+# Solve an n-rooks or n-queens request, returns the fields of the response
+def solve_pieces(request, time_limit, stats):
+    queens = request['problem'] == 'nqueen'
+    n = int(request['n'])
+    engine = request.get('engine', 'bitmask')
+    if n < 1:
+        raise ValueError("n must be at least 1")
+    if engine not in ('bitmask', 'dfs', 'minconflicts' if queens else 'bfs'):
+        raise ValueError("unknown engine " + str(engine) + " for " + request['problem'])
+    a0.N, a0.x, a0.y = n, int(request.get('x', 0)), int(request.get('y', 0))
+    a0.blocked = [(int(r), int(c)) for r, c in request.get('blocked', [])]
+    timer = time_limit is not None and hasattr(signal, 'setitimer')
+    if timer:
+        signal.setitimer(signal.ITIMER_REAL, time_limit)
+    try:
+        if engine == 'bitmask':
+            placement = a0.solve_bitmask(queens,stats)
+        elif engine == 'minconflicts':
+            placement = a0.solve_min_conflicts(request.get('seed'),stats=stats)
+        else:
+            board = [[0] * n] * n
+            if engine == 'bfs':
+                if a0.unavailable():
+                    raise ValueError("the bfs engine does not take unavailable squares")
+                nrooks.N = n
+                board = nrooks.solve_bfs(board,stats)
+            else:
+                board = a0.solve_queens(board,stats) if queens else a0.solve_rooks(board,stats)
+            placement = [row.index(1) for row in board] if board else False
+    finally:
+        if timer:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+    if placement is False:
+        return {'status': 'no solution'}
+    return {'status': 'solved', 'placement': [col + 1 for col in placement]}
+
+problems = {'puzzle16': solve_puzzle, 'nqueen': solve_pieces, 'nrook': solve_pieces}
+
+# Answer one request in a worker process, returns the response as a dict
+def handle(job):
+    request, default_limit = job
+    response = {'id': request.get('id')}
+    stats = SearchStats()
+    try:
+        if request.get('problem') not in problems:
+            raise ValueError("problem must be one of " + ", ".join(sorted(problems)))
+        time_limit = request.get('time_limit', default_limit)
+        response.update(problems[request['problem']](request,
+                                                     float(time_limit) if time_limit is not None else None,stats))
+    except TimeLimitExceeded:
+        response['status'] = 'timeout'
+    except (KeyError, TypeError, ValueError) as error:
+        response['status'] = 'invalid'
+        response['error'] = str(error) if not isinstance(error, KeyError) else "missing " + str(error)
+    except Exception as error:
+        response['status'] = 'error'
+        response['error'] = repr(error)
+    response['expanded'] = stats.expanded
+    response['seconds'] = round(stats.seconds, 6)
+    return response
+
+# Read requests from lines until the input ends, hand them to the pool and write each response to
+# output as soon as it comes back. Returns once every response has been written.
+def serve_lines(lines, output, pool, time_limit):
+    lock = threading.Lock()
+    # Called from the thread of the pool that collects results, which must not be stopped by a
+    # client that has gone away
+    def write(response):
+        lock.acquire()
+        try:
+            output.write(json.dumps(response) + "\n")
+            output.flush()
+        except (IOError, OSError):
+            pass
+        finally:
+            lock.release()
+    pending = []
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("a request must be a JSON object")
+        except ValueError as error:
+            write({'id': None, 'status': 'invalid', 'error': str(error)})
+            continue
+        pending.append(pool.apply_async(handle, ((request, time_limit),), callback=write))
+        pending = [result for result in pending if not result.ready()]
+    for result in pending:
+        result.wait()
+
+# Iterate over the lines of a file without the read-ahead buffering of Python 2 file iterators, so
+# a request is answered as soon as its line arrives
+def read_lines(input_file):
+    return iter(input_file.readline, '')
+
+class Connection(socketserver.StreamRequestHandler):
+    def handle(self):
+        lines = (line.decode('utf-8') for line in iter(self.rfile.readline, b''))
+        serve_lines(lines, Writer(self.wfile), self.server.pool, self.server.time_limit)
+
+# Text output over the binary stream of a socket connection
+class Writer(object):
+    def __init__(self, stream):
+        self.stream = stream
+
+    def write(self, text):
+        self.stream.write(text.encode('utf-8'))
+
+    def flush(self):
+        self.stream.flush()
+
+class Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Answer 16 puzzle, n-rooks and n-queens requests given as JSON lines")
+    parser.add_argument("--socket", metavar="PATH",
+                        help="listen on a Unix socket at PATH instead of reading stdin and writing stdout")
+    parser.add_argument("--workers", type=int, default=multiprocessing.cpu_count(),
+                        help="number of worker processes, defaults to the number of cores")
+    parser.add_argument("--pdb", default=pdb16.default_file,
+                        help="pattern database built by pdb16.py, the manhattan distance is used if the file does not exist")
+    parser.add_argument("--time-limit", type=float, default=None,
+                        help="give up on a request after this many seconds unless the request sets its own time_limit")
+    args = parser.parse_args()
+
+    pdb = args.pdb if os.path.exists(args.pdb) else None
+    pool = multiprocessing.Pool(args.workers, init_worker, (pdb,))
+    # Stop the same way on SIGTERM as on Ctrl-C, so the socket file is removed
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+        if args.socket is None:
+            serve_lines(read_lines(sys.stdin), sys.stdout, pool, args.time_limit)
+        else:
+            if os.path.exists(args.socket):
+                os.remove(args.socket)
+            server = Server(args.socket, Connection)
+            server.pool, server.time_limit = pool, args.time_limit
+            try:
+                server.serve_forever()
+            finally:
+                server.server_close()
+                os.remove(args.socket)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        pool.terminate()
+        pool.join()
@@ -16,21 +16,27 @@
 # We relax the heuristic to calculate manhattan distance divided by 3,to account for the fact that a maximum of
 # 3 tiles can be placed in their correct position in one move.
 # For this problem, the heuristic Manhattan distance divided by 3 will always be admissible.
+# A stronger heuristic is read from a pattern database when one has been built with pdb16.py,
+# pdb16.py explains why it stays admissible when up to 3 tiles are shifted in one move.
+# Boards of other shapes, from 2 x 2 up to 9 x 9, are solved the same way with the shape taken from the
+# board file. A move shifts one tile up to every tile on one side of the blank in its row or column, and
+# the manhattan distance along the rows and along the columns is divided by the most tiles a move can
+# shift that way. The pattern database is only used for 4 x 4 boards.
 
 # (2) How the search algorithm works
 
 # I have defined a class Node to store the node state, its corresponding g(s) -- cost to reach that state from the initial state,
 # h(s) is the minimum number of moves required to reach the goal state from current state, 
-# f(s) = g(s) + h(s), and the path taken to reach that state
+# f(s) = g(s) + h(s), and the node it was reached from along with the move taken, so the path can be rebuilt
 
 # The initial state is read from the input file
 # The goal state has been defined in the code.
-# The a star search function solve() will be initialized with the initial state from the board, g(s) = 0 and path =[]
-# from there we check if this state is the goal state, if not we look for the successors and add the current node to a visited dict
-# For each successor we check if the successor is the goal state, if so we quit and return the Node object path.
-# If the successor if not a goal state, we check if it has not been visited. If it has not been visited we add it to the fringe 
-# along with it total cost f(s) which acts as its priority.
-# We maintain the visited dictionary with the nodes already expanded to reduce computations.
+# The a star search function solve() will be initialized with the initial state from the board, g(s) = 0 and no parent
+# from there we take the node with the lowest f(s) from the fringe, if it is the goal state we quit and return the Node object path,
+# if not we look for the successors.
+# For each successor we check the lowest cost g(s) it has been reached with so far. If it has not been reached at a
+# lower or equal cost before we add it to the fringe along with it total cost f(s) which acts as its priority.
+# We maintain the dictionary of lowest costs so the same board is not added to the fringe again and again.
 
 # (3) Problems faced -
 # Earlier used heapq implementation of priority queue
@@ -42,49 +48,213 @@
 # if we try to check if a successor state exists in the fringe previously, the computations take too long to process
 # the code works much faster without that check.
 # found it much simpler to use Priority Queue compared to heapq.
+# Priority Queue locks on every put and get and compared Node objects on equal costs, so the fringe is now
+# a heapq again. Instead of changing priorities in place, a board is pushed again when it is reached at a lower
+# cost and the older entry is skipped when it comes out of the heap.
 
+import os
 import sys
+import json
+import time
+import argparse
+import multiprocessing
 import numpy as np
-from Queue import PriorityQueue
-from copy import deepcopy
+import pdb16
+import cache16
+from searchstats import SearchStats
+from heapq import heappush, heappop
+from itertools import count
 #sys.setrecursionlimit(10000) 
 
 #Initialize direction variable variables
 shift = ['L','R','U','D']
-#Initialize the goal index to hold the coordinates for the goal state
-goal_index={}
+# Direction of the move that undoes a move, as many tiles shifted back along the same row or column
+opposite = {'L': 'R', 'R': 'L', 'U': 'D', 'D': 'U'}
+
+
+# Packed board representation
+# The board is stored as a single integer with a fixed number of bits per tile, 4 for the 16 puzzle.
+# The tile in cell p = cols*row + col is kept in bits bits*p to bits*(p+1) - 1 and the blank tile is
+# stored as 0, so a whole 4 x 4 board fits in 64 bits. The position of the blank is kept next to the
+# packed board so it never has to be searched for. rows, cols, bits and tile_mask are set by set_shape.
+def pack(board):
+    state = 0
+    blank = 0
+    for i in range(0,rows):
+        for j in range(0,cols):
+            state |= board[i][j] << (bits*(cols*i + j))
+            if board[i][j] == 0:
+                blank = cols*i + j
+    return state, blank
+
+def unpack(state):
+    return [[(state >> (bits*(cols*i + j))) & tile_mask for j in range(0,cols)] for i in range(0,rows)]
+
+# Precomputed move tables
+# Shifting k tiles towards the blank moves each of those tiles by one cell in the same direction,
+# so every move is a single masked shift of the packed board: the tiles under the mask are moved
+# by one cell along a row or one row along a column into the blank's place. Every tile of the row or
+# column on one side of the blank can be shifted in one move.
+# moves[b] lists the moves available when the blank is in cell b as tuples of
+# (bits that stay, bits that move, right shift, left shift, new blank cell, move code,
+#  cell the last moved tile lands on, whether this is the first move in its direction,
+#  first bit of the last moved tile before the move)
+# The move code is the index of the move string in move_names, the horizontal moves come first and
+# there are horizontal_moves of them. A move string is the direction, the number of tiles and the row
+# or column, counted from 1.
+# A k tile move is the k-1 tile move in the same direction plus one more tile, which moves from
+# the new blank cell to the cell next to it, so the heuristic can be updated one tile at a time.
+def build_move_names():
+    return [''.join([s,str(i),str(line)]) for s in shift for i in range(1,cols if s in 'LR' else rows)
+            for line in range(1,(rows if s in 'LR' else cols) + 1)]
+
+def build_moves():
+    moves = []
+    for b in range(0,cells):
+        row, col = b // cols, b % cols
+        board_moves = []
+        for s in shift:
+            # The tiles to the right of the blank move left, the tiles above the blank move down etc.
+            if s == 'L':
+                step, n, line = 1, cols - 1 - col, row
+            elif s == 'R':
+                step, n, line = -1, col, row
+            elif s == 'U':
+                step, n, line = cols, rows - 1 - row, col
+            else:
+                step, n, line = -cols, row, col
+            mask = 0
+            for i in range(1,n+1):
+                mask |= tile_mask << (bits*(b + i*step))
+                right, left = (bits*step, 0) if step > 0 else (0, -bits*step)
+                board_moves.append((~mask, mask, right, left, b + i*step, move_names.index(''.join([s,str(i),str(line+1)])),
+                                    b + (i-1)*step, i == 1, bits*(b + i*step)))
+        moves.append(board_moves)
+    return moves
+
+# Manhattan distance of every tile from its cell on board, the goal for the searches, for each cell
+# distance[k][p] is the distance of tile k when it is in cell p, the blank does not count.
+# The distance along the rows is kept in the low 16 bits and the distance along the columns above them.
+def build_distance(board):
+    distance = [[0]*cells for k in range(0,cells)]
+    for i in range(0,rows):
+        for j in range(0,cols):
+            k = board[i][j]
+            if k != 0:
+                distance[k] = [abs(p%cols - j) + (abs(p//cols - i) << 16) for p in range(0,cells)]
+    return distance
+
+# A horizontal move of k tiles lowers the distance along the rows by at most k and leaves the distance
+# along the columns as it is, so at least the distance along the rows over cols - 1, rounded up, horizontal
+# moves are needed, and the same for the columns. Returns the estimate and estimate_block that turn the
+# keys of build_distance into that number of moves.
+def build_estimate():
+    across, down = cols - 1, rows - 1
+    def manhattan_estimate(h_key):
+        return ((h_key & 0xFFFF) + across - 1)//across + ((h_key >> 16) + down - 1)//down
+    low, high = np.uint64(0xFFFF), np.uint64(16)
+    block_across, block_down = np.uint64(across), np.uint64(down)
+    def manhattan_estimate_block(h_keys):
+        return (((h_keys & low) + block_across - np.uint64(1))//block_across
+                + ((h_keys >> high) + block_down - np.uint64(1))//block_down).astype(np.int64)
+    return manhattan_estimate, manhattan_estimate_block
+
+# Cell of every tile packed 4 bits per tile, tile k in bits 4k to 4k+3, for each cell of the board
+# Summed over the tiles of a board this gives where each tile is, which indexes the pattern database
+def build_position_key():
+    return [[p << (4*k) for p in range(0,16)] if k != 0 else [0]*16 for k in range(0,16)]
+
+# Apply the move with the given code to a packed board, returns the board and its blank cell or None
+# when the move is not possible
+def apply_move(state, blank, code):
+    for keep, mask, right, left, new_blank, move, target, first, offset in moves[blank]:
+        if move == code:
+            return (state & keep) | ((state & mask) >> right << left), new_blank
+    return None
+
+# Play a list of move strings on a board, returns the board reached or None when a move is not possible
+def play_moves(board, move_list):
+    state, blank = pack(board)
+    for name in move_list:
+        moved = apply_move(state, blank, move_names.index(name))
+        if moved is None:
+            return None
+        state, blank = moved
+    return unpack(state)
+
+# The heuristic is computed from a key that is a sum over the tiles of tile_key[k][p],
+# so moving a tile only changes the key by the difference of two table entries.
+# estimate turns the key into the number of moves. By default the key is the sum of
+# manhattan distances and estimate comes from build_estimate, use_pattern_database switches to the
+# tables built by pdb16.py, which are for 4 x 4 boards.
+# tile_key_block and estimate_block are the same for numpy arrays of keys, used by expand_block.
+# They are all set by set_shape.
+def use_pattern_database(filename):
+    global tile_key, tile_key_block, estimate, estimate_block
+    if (rows, cols) != (4, 4):
+        raise ValueError("the pattern database of pdb16.py is for 4 x 4 boards")
+    pdb = pdb16.load(filename)
+    # A uint8 view of the mapped file, so worker processes share its pages instead of each holding a copy
+    pdb_block = np.frombuffer(pdb, dtype=np.uint8)
+    first, second, third = len(pdb16.header), len(pdb16.header) + pdb16.table_size, len(pdb16.header) + 2*pdb16.table_size
+    # Tiles 1-5, 6-10 and 11-15 each take 20 bits of the key.
+    # Indexing the mmap gives 1 character strings on Python 2, there the bytes are read
+    # as ints through the uint8 view, which is slower than indexing the mmap on Python 3
+    if isinstance(pdb[0], int):
+        def pattern_estimate(h_key):
+            return (pdb[first + ((h_key >> 4) & 0xFFFFF)] + pdb[second + ((h_key >> 24) & 0xFFFFF)] + pdb[third + (h_key >> 44)] + 5)//6
+    else:
+        read = pdb_block.item
+        def pattern_estimate(h_key):
+            return (read(first + ((h_key >> 4) & 0xFFFFF)) + read(second + ((h_key >> 24) & 0xFFFFF)) + read(third + (h_key >> 44)) + 5)//6
+    def pattern_estimate_block(h_keys):
+        cells = np.uint64(0xFFFFF)
+        return (pdb_block[first + ((h_keys >> np.uint64(4)) & cells).astype(np.int64)].astype(np.int64)
+                + pdb_block[second + ((h_keys >> np.uint64(24)) & cells).astype(np.int64)].astype(np.int64)
+                + pdb_block[third + (h_keys >> np.uint64(44)).astype(np.int64)].astype(np.int64) + 5)//6
+    tile_key = build_position_key()
+    tile_key_block = np.array(tile_key, dtype=np.uint64)
+    estimate = pattern_estimate
+    estimate_block = pattern_estimate_block
     
     
 # Creating an object to store all the values related to the state of the board
-# such as the board state, it cost to reach that state, heuristic , path at that state
+# such as the board state, it cost to reach that state, heuristic , the node it came from and the move made
 
 # Referred the best way to store multiple values for a state from http://www.geeksforgeeks.org/g-fact-41-multiple-return-values-in-python/
-class Node:
-    def __init__(self, node,cost,path):
+# The heuristic key is kept on the node so that successors only have to
+# update it for the tiles they move.
+# Nodes only point to their parent, so memory per node does not grow with the depth, and the
+# slots keep Python from giving every node its own attribute dictionary.
+class Node(object):
+    __slots__ = ('node_state','blank','cost_of_move','h_key','total_cost','parent','move')
+
+    def __init__(self, node,blank,cost,parent,move,h_key):
         self.node_state = node
+        self.blank = blank
         self.cost_of_move = cost
-        self.total_cost = self.cost_of_move + self.heuristic_2(self.node_state)
-        self.path = path
-        
-    # Second Heuristic  - Sum of manhattan distance of each number from its goal state
-    def heuristic_2(self,node_state):
+        self.h_key = h_key
+        self.total_cost = self.cost_of_move + estimate(h_key)
+        self.parent = parent
+        self.move = move
+
+    # Rebuild the list of move strings by following the parents back to the initial board
+    def path(self):
+        path = []
+        node = self
+        while node.parent is not None:
+            path.append(move_names[node.move])
+            node = node.parent
+        path.reverse()
+        return path
         
-        #First get the coordinated of each tile in the current board
-        current_index={}
-        for i in range(0,4):
-            for j in range(0,4):
-                if node_state[i][j] !=0:
-                    current_index[node_state[i][j]] =[i,j]
-        if len(goal_index) == 0:
-            for i in range(0,4):
-                for j in range(0,4):
-                    if goal_state[i][j] != 0:
-                        goal_index[goal_state[i][j]]=[i,j]
-        man_dist = 0
-        for k in goal_index:
-            if k != 0:
-                man_dist = man_dist + abs(current_index[k][0] - goal_index[k][0]) + abs(current_index[k][1] - goal_index[k][1])
-        return man_dist/3
+# Second Heuristic  - Key of the whole board, by default the sum of manhattan distance of each number from its goal state
+# Only used for the initial board, successors update the key of their parent
+def heuristic_2(node_state):
+    h_key = 0
+    for p in range(0,cells):
+        h_key = h_key + tile_key[(node_state >> (bits*p)) & tile_mask][p]
+    return h_key
         
 
 def successors(current_node):
@@ -92,106 +262,123 @@ def successors(current_node):
     board =current_node.node_state
     cost = current_node.cost_of_move + 1 #For each successor of the previous state, the cost will be cost until previous state + 1
     
-    #Get the row and col position of the blank tile on the board
-    row = np.where(np.array(board)==0)[0][0]
-    col = np.where(np.array(board)==0)[1][0]
-    n = len(board) - 1 - col #Number of possible shifts horizontally
-    m = len(board) - 1 - row #Number of possible shifts vertically
     #Based on the position of the blank tile, we will move the numbered tiles left, right, up and down
-    for s in shift:
-        # Generate successors by shifting one, two or three numbered tiles left
-        if n != 0 and s == 'L':
-            for i in range(0,n):
-                if i == 0:
-                    board_1 = deepcopy(board)
-                    board_1[row][col+i], board_1[row][col+1+i] = board_1[row][col+1+i], board_1[row][col+i]
-                    path_1 = current_node.path[:]
-                    path_1.append(''.join([s,str(i+1),str(row+1)]))
-                    succ_nodes.append(Node(board_1,cost,path_1))
-                if i == 1:
-                    board_2 = deepcopy(board_1)
-                    board_2[row][col+i], board_2[row][col+1+i] = board_2[row][col+1+i], board_2[row][col+i]
-                    path_2 = current_node.path[:]
-                    path_2.append(''.join([s,str(i+1),str(row+1)]))
-                    succ_nodes.append(Node(board_2,cost,path_2))
-            
-                if i == 2:
-                    board_3 = deepcopy(board_2)
-                    board_3[row][col+i], board_3[row][col+1+i] = board_3[row][col+1+i], board_3[row][col+i]
-                    path_3 = current_node.path[:]
-                    path_3.append(''.join([s,str(i+1),str(row+1)]))
-                    succ_nodes.append(Node(board_3,cost,path_3))
-        # Generate successors by shifting one, two or three numbered tiles right
-        if n != 3 and s == 'R':
-            for i in range(0,col):
-                if i == 0:
-                    board_4 = deepcopy(board)
-                    board_4[row][col-i], board_4[row][col-1-i] = board_4[row][col-1-i], board_4[row][col-i]
-                    path_4 = current_node.path[:]
-                    path_4.append(''.join([s,str(i+1),str(row+1)]))
-                    succ_nodes.append(Node(board_4,cost,path_4))
-                if i == 1:
-                    board_5 = deepcopy(board_4)
-                    board_5[row][col-i], board_5[row][col-1-i] = board_5[row][col-1-i], board_5[row][col-i]
-                    path_5 = current_node.path[:]
-                    path_5.append(''.join([s,str(i+1),str(row+1)]))
-                    succ_nodes.append(Node(board_5,cost,path_5))
-                if i == 2:
-                    board_6 = deepcopy(board_5)
-                    board_6[row][col-i], board_6[row][col-1-i] = board_6[row][col-1-i], board_6[row][col-i]
-                    path_6 = current_node.path[:]
-                    path_6.append(''.join([s,str(i+1),str(row+1)]))
-                    succ_nodes.append(Node(board_6,cost,path_6))
-                   
-        # Generate successors by shifting one, two or three numbered tiles up
-        if m != 0 and s == 'U':
-            for i in range(0,m):
-                if i == 0:
-                    board_7 = deepcopy(board)
-                    board_7[row+i][col], board_7[row+i+1][col] = board_7[row+i+1][col], board_7[row+i][col]
-                    path_7 = current_node.path[:]
-                    path_7.append(''.join([s,str(i+1),str(col+1)]))
-                    succ_nodes.append(Node(board_7,cost,path_7))
-                    
-                if i == 1:
-                    board_8 = deepcopy(board_7)
-                    board_8[row+i][col], board_8[row+i+1][col] = board_8[row+i+1][col], board_8[row+i][col]
-                    path_8 = current_node.path[:]
-                    path_8.append(''.join([s,str(i+1),str(col+1)]))
-                    succ_nodes.append(Node(board_8,cost,path_8))
-                if i == 2:
-                    board_9 = deepcopy(board_8)
-                    board_9[row+i][col], board_9[row+i+1][col] = board_9[row+i+1][col], board_9[row+i][col]
-                    path_9 = current_node.path[:]
-                    path_9.append(''.join([s,str(i+1),str(col+1)]))
-                    succ_nodes.append(Node(board_9,cost,path_9))
-        # Generate successors by shifting one, two or three numbered tiles down
-        if m != 3 and s == 'D':
-            for i in range(0,row):
-                if i == 0:
-                    board_10 = deepcopy(board)
-                    board_10[row-i][col], board_10[row-i-1][col] = board_10[row-i-1][col], board_10[row-i][col]
-                    path_10 = current_node.path[:]
-                    path_10.append(''.join([s,str(i+1),str(col+1)]))
-                    succ_nodes.append(Node(board_10,cost,path_10))
-                if i == 1:
-                    board_11 = deepcopy(board_10)
-                    board_11[row-i][col], board_11[row-i-1][col] = board_11[row-i-1][col], board_11[row-i][col]
-                    path_11 = current_node.path[:]
-                    path_11.append(''.join([s,str(i+1),str(col+1)]))
-                    succ_nodes.append(Node(board_11,cost,path_11))
-                if i == 2:
-                    board_12 = deepcopy(board_11)
-                    board_12[row-i][col], board_12[row-i-1][col] = board_12[row-i-1][col], board_12[row-i][col]    
-                    path_12 = current_node.path[:]
-                    path_12.append(''.join([s,str(i+1),str(col+1)]))
-                    succ_nodes.append(Node(board_12,cost,path_12))
+    for keep, mask, right, left, blank, move, target, first, offset in moves[current_node.blank]:
+        if first:
+            h_key = current_node.h_key
+        #The tile moved last goes from the new blank cell to target
+        k = (board >> offset) & tile_mask
+        h_key = h_key + tile_key[k][target] - tile_key[k][blank]
+        succ_nodes.append(Node((board & keep) | ((board & mask) >> right << left),blank,cost,current_node,move,h_key))
     return succ_nodes
 
 
+# Batched successor generation
+# The move tables as numpy arrays with one row per blank cell and one column per move, padded to the
+# rows + cols - 2 moves of a blank that is not on an edge. Every move also lists the cells the moved tiles
+# come from and go to, padded to the longest move with cell 0 going to cell 0, which does not change the
+# heuristic key. The boards have to fit in 64 bits, None is returned for larger boards.
+def build_move_block():
+    if bits*cells > 64:
+        return None
+    width, longest = rows + cols - 2, max(rows, cols) - 1
+    keep = np.zeros((cells,width), dtype=np.uint64)
+    mask = np.zeros((cells,width), dtype=np.uint64)
+    right = np.zeros((cells,width), dtype=np.uint64)
+    left = np.zeros((cells,width), dtype=np.uint64)
+    blank = np.zeros((cells,width), dtype=np.int64)
+    code = np.zeros((cells,width), dtype=np.int64)
+    valid = np.zeros((cells,width), dtype=bool)
+    moved_from = np.zeros((cells,width,longest), dtype=np.int64)
+    moved_to = np.zeros((cells,width,longest), dtype=np.int64)
+    for b in range(0,cells):
+        for i, (k, m, r, l, new_blank, move, target, first, offset) in enumerate(moves[b]):
+            if first:
+                tiles = []
+            tiles.append((new_blank, target))
+            keep[b,i], mask[b,i], right[b,i], left[b,i] = m ^ 0xFFFFFFFFFFFFFFFF, m, r, l
+            blank[b,i], code[b,i], valid[b,i] = new_blank, move, True
+            for j, (p, q) in enumerate(tiles):
+                moved_from[b,i,j], moved_to[b,i,j] = p, q
+    return keep, mask, right, left, blank, code, valid, moved_from, moved_to
+
+# Generate the successors of a block of boards at once.
+# states and h_keys are uint64 arrays of packed boards and heuristic keys, blanks the blank cells.
+# Returns arrays of the successor boards, their blank cells, heuristic keys and heuristics, the
+# row of the parent in the block and the move code, with all the successors of the block in one array.
+def expand_block(states,blanks,h_keys):
+    keep, mask, right, left, blank, code, valid, moved_from, moved_to = move_block
+    width, longest = moved_from.shape[1:]
+    boards = states[:,None]
+    children = (boards & keep[blanks]) | ((boards & mask[blanks]) >> right[blanks] << left[blanks])
+    keys = np.repeat(h_keys[:,None], width, axis=1)
+    for j in range(0,longest):
+        cell_from, cell_to = moved_from[blanks,:,j], moved_to[blanks,:,j]
+        tiles = ((boards >> (cell_from * bits).astype(np.uint64)) & np.uint64(tile_mask)).astype(np.int64)
+        keys = keys + tile_key_block[tiles,cell_to] - tile_key_block[tiles,cell_from]
+    valid = valid[blanks]
+    parents = np.repeat(np.arange(len(states))[:,None], width, axis=1)
+    keys = keys[valid]
+    return children[valid], blank[blanks][valid], keys, estimate_block(keys), parents[valid], code[blanks][valid]
+
+
+# Board shape
+# set_shape builds everything that depends on the shape of the board, the goal, the packing, the move
+# names and tables and the manhattan distance heuristic, which it switches back to, for boards of rows
+# by cols. The module starts with the 4 x 4 board of the 16 puzzle. The goal holds the tiles in order
+# row by row with the blank in the last cell. A tile takes as many bits as the largest tile needs.
+# Up to 9 rows and columns are allowed so the numbers in the move strings have one digit. The numpy
+# tables of expand_block are only built for boards that fit in 64 bits.
+def set_shape(board_rows,board_cols):
+    global rows, cols, cells, bits, tile_mask, goal_state, goal, goal_blank, move_names, horizontal_moves, inverse_move
+    global moves, distance, tile_key, tile_key_block, estimate, estimate_block, move_block
+    if not (2 <= board_rows <= 9 and 2 <= board_cols <= 9):
+        raise ValueError("a board must have 2 to 9 rows and 2 to 9 columns")
+    rows, cols = board_rows, board_cols
+    cells = rows*cols
+    bits = (cells - 1).bit_length()
+    tile_mask = (1 << bits) - 1
+    goal_state = [[(cols*i + j + 1) % cells for j in range(0,cols)] for i in range(0,rows)]
+    goal, goal_blank = pack(goal_state)
+    move_names = build_move_names()
+    horizontal_moves = 2*rows*(cols - 1)
+    # Code of the move that undoes each move
+    inverse_move = [move_names.index(opposite[name[0]] + name[1:]) for name in move_names]
+    moves = build_moves()
+    distance = build_distance(goal_state)
+    tile_key = distance
+    estimate, estimate_block = build_estimate()
+    move_block = build_move_block()
+    tile_key_block = np.array(tile_key, dtype=np.uint64) if move_block is not None else None
+
+set_shape(4,4)
+
+
+# Raised by the search functions when they run past their time limit
+class TimeLimitExceeded(Exception):
+    pass
+
+# The time limit is only checked, and the stats only updated, every so many expanded nodes
+# to keep the cost of the check down
+check_interval = 1024
+
+# When the phases of a search are timed, estimate is wrapped for the length of the search
+# so the time spent in the heuristic can be told apart from the rest of generating successors
+def time_heuristic(stats):
+    global estimate, estimate_block
+    saved = (estimate, estimate_block)
+    estimate = stats.timed('heuristic', estimate)
+    estimate_block = stats.timed('heuristic', estimate_block)
+    return saved
+
+def restore_heuristic(saved):
+    global estimate, estimate_block
+    estimate, estimate_block = saved
+
+
 # check if board is a goal state
 def is_goal(board):
-    if board.node_state == goal_state:
+    if board.node_state == goal:
         return True
     else:
         return False
@@ -199,41 +386,504 @@ def is_goal(board):
 # Referred Pseudo Code for A-star from https://en.wikipedia.org/wiki/A*_search_algorithm 
 # and http://www.growingwiththeweb.com/2012/06/a-pathfinding-algorithm.html
 # Solve 16 puzzle
-def solve(initial_node,goal_state):
+# time_limit is in seconds, stats is an optional SearchStats that gets the counters of the search
+# cache is an optional cache16.SolutionCache. The distances it holds are used as exact heuristic values,
+# and a board from it that comes off the fringe ends the search with the rest of the path from the cache:
+# the exact total cost of that board is the lowest on the fringe, so no other path can be shorter.
+def solve(initial_node,goal_state,time_limit=None,stats=None,cache=None):
     #for the initial state of the board, the cost function g is 0.
     #thus, the evaluation function is equal to the heuristic. i.e
     #initial cost of move is 0
-    start_node = Node(initial_node,0,[])
-    #Priority queue to get element with the lowest total cost
-    fringe = PriorityQueue()
-    fringe.put((start_node.total_cost,start_node))
-    visited = {}
+    initial, blank = pack(initial_node)
+    start_node = Node(initial,blank,0,None,None,heuristic_2(initial))
+    #Binary heap of (total cost, heuristic, insertion order, node) to get the element with the lowest total cost.
+    #Ties go to the lower heuristic, i.e. the node furthest along its path, and then to the oldest node,
+    #so the nodes themselves are never compared
+    order = count()
+    fringe = [(start_node.total_cost,start_node.total_cost,next(order),start_node)]
+    #Lowest cost found so far for every packed board that has been put on the fringe.
+    #A board reached again at the same or a higher cost is dropped before it is put on the fringe,
+    #and fringe entries that have since been reached at a lower cost are skipped when they come out.
+    best_cost = {initial: 0}
+    deadline = time.time() + time_limit if time_limit is not None else None
+    expanded = generated = duplicates = depth = 0
+    cached = cache is not None and len(cache) > 0
+    timing = stats is not None and stats.timing
+    if stats is not None:
+        stats.begin()
+    pop, push, expand = heappop, heappush, successors
+    if timing:
+        saved = time_heuristic(stats)
+        pop, push = stats.timed('open list', heappop), stats.timed('open list', heappush)
+        expand = stats.timed('successors', successors)
     
-    while not fringe.empty():
-        current = fringe.get()
-        if current[1].node_state == goal_state:
-            return (current[1].path)
-        if str(current[1].node_state) in visited:
+    try:
+        while fringe:
+            current = pop(fringe)[3]
+            if current.cost_of_move > best_cost[current.node_state]:
+                duplicates += 1
+                continue
+            if is_goal(current):
+                return (current.path())
+            if cached and cache.distance(current.node_state) is not None:
+                rest = cached_path(cache,current.node_state,current.blank)
+                if rest is not None:
+                    return current.path() + rest
+            expanded += 1
+            if current.cost_of_move > depth:
+                depth = current.cost_of_move
+            if expanded % check_interval == 0:
+                if deadline is not None and time.time() > deadline:
+                    raise TimeLimitExceeded()
+                if stats is not None:
+                    stats.update(generated,expanded,duplicates,len(fringe),len(best_cost),depth)
+            list_successors = expand(current)
+            generated += len(list_successors)
+            if timing:
+                token = stats.start_phase()
+            for s in list_successors:
+                if cached:
+                    distance = cache.distance(s.node_state)
+                    if distance is not None:
+                        s.total_cost = s.cost_of_move + distance
+                if best_cost.get(s.node_state, s.cost_of_move + 1) <= s.cost_of_move:
+                    duplicates += 1
+                    continue
+                best_cost[s.node_state] = s.cost_of_move
+                push(fringe,(s.total_cost,s.total_cost - s.cost_of_move,next(order),s))
+            if timing:
+                stats.end_phase('duplicates',token)
+
+        return False
+    finally:
+        if timing:
+            restore_heuristic(saved)
+        if stats is not None:
+            stats.finish(generated,expanded,duplicates,len(fringe),len(best_cost),depth)
+
+
+# A* that expands the fringe a block at a time with expand_block
+# All the nodes on the fringe with the lowest total cost are taken off together, up to block nodes,
+# and their successors are generated and scored in one pass. Taking only nodes with the same total
+# cost keeps the search optimal: a goal taken off the fringe can not be beaten by a node of the same
+# block that has not been expanded yet.
+# Nodes are kept in parallel lists indexed by node number instead of Node objects.
+# time_limit and stats are the same as for solve()
+def solve_block(initial_node,goal_state,time_limit=None,stats=None,block=256):
+    if move_block is None:
+        raise ValueError("boards of %d x %d do not fit in the 64 bits of the block search" % (rows, cols))
+    initial, blank = pack(initial_node)
+    h_key = heuristic_2(initial)
+    states, blanks, h_keys, costs, parents, codes = [initial], [blank], [h_key], [0], [-1], [-1]
+    #Heap of (total cost, heuristic, node number), the node number also keeps the insertion order
+    fringe = [(estimate(h_key),estimate(h_key),0)]
+    best_cost = {initial: 0}
+    deadline = time.time() + time_limit if time_limit is not None else None
+    expanded = generated = duplicates = depth = 0
+    timing = stats is not None and stats.timing
+    if stats is not None:
+        stats.begin()
+    pop, push, expand = heappop, heappush, expand_block
+    if timing:
+        saved = time_heuristic(stats)
+        pop, push = stats.timed('open list', heappop), stats.timed('open list', heappush)
+        expand = stats.timed('successors', expand_block)
+
+    try:
+        while fringe:
+            picked = []
+            lowest = fringe[0][0]
+            while fringe and fringe[0][0] == lowest and len(picked) < block:
+                i = pop(fringe)[2]
+                if costs[i] > best_cost[states[i]]:
+                    duplicates += 1
+                    continue
+                if states[i] == goal:
+                    path = []
+                    while parents[i] != -1:
+                        path.append(move_names[codes[i]])
+                        i = parents[i]
+                    path.reverse()
+                    return path
+                picked.append(i)
+            if not picked:
+                continue
+            expanded += len(picked)
+            depth = max(depth, costs[picked[-1]])
+            if deadline is not None and time.time() > deadline:
+                raise TimeLimitExceeded()
+            if stats is not None:
+                stats.update(generated,expanded,duplicates,len(fringe),len(best_cost),depth)
+            children = expand(np.array([states[i] for i in picked], dtype=np.uint64),
+                              np.array([blanks[i] for i in picked], dtype=np.int64),
+                              np.array([h_keys[i] for i in picked], dtype=np.uint64))
+            generated += len(children[0])
+            if timing:
+                token = stats.start_phase()
+            for child, child_blank, child_key, h, row, move in zip(*[a.tolist() for a in children]):
+                parent = picked[row]
+                cost = costs[parent] + 1
+                if best_cost.get(child, cost + 1) <= cost:
+                    duplicates += 1
+                    continue
+                best_cost[child] = cost
+                push(fringe,(cost + h,h,len(states)))
+                states.append(child)
+                blanks.append(child_blank)
+                h_keys.append(child_key)
+                costs.append(cost)
+                parents.append(parent)
+                codes.append(move)
+            if timing:
+                stats.end_phase('duplicates',token)
+
+        return False
+    finally:
+        if timing:
+            restore_heuristic(saved)
+        if stats is not None:
+            stats.finish(generated,expanded,duplicates,len(fringe),len(best_cost),depth)
+
+
+# Iterative deepening A*
+# A depth first search that stops at nodes whose f(s) = g(s) + h(s) is above a bound. When no solution
+# is found the bound is raised to the smallest f(s) that was above it and the search starts over.
+# Only the current path is kept in memory, so memory grows with the depth of the solution and not
+# with the number of nodes: each move is applied to the board of the caller, which is left unchanged
+# and carries on with the next move once the search below it returns, and the move string is pushed
+# on the shared path and popped off again.
+# Two moves in a row along the same row or column can always be replaced by a single move, so after
+# a horizontal move only vertical moves are tried and the other way round.
+# time_limit and stats are the same as for solve()
+def solve_ida(initial_node,goal_state,time_limit=None,stats=None):
+    initial, blank = pack(initial_node)
+    h_key = heuristic_2(initial)
+    bound = estimate(h_key)
+    path = []
+    #Counters, the deepest cost reached and the time to give up at, shared by the whole search
+    search = {'expanded': 0, 'generated': 0, 'depth': 0, 'stats': stats,
+              'deadline': time.time() + time_limit if time_limit is not None else None}
+    timing = stats is not None and stats.timing
+    if stats is not None:
+        stats.begin()
+    if timing:
+        saved = time_heuristic(stats)
+    try:
+        while True:
+            result = ida_search(initial,blank,0,h_key,bound,None,path,search)
+            if result is True:
+                return path
+            if result is None:
+                return False
+            bound = result
+    finally:
+        if timing:
+            restore_heuristic(saved)
+        if stats is not None:
+            stats.finish(search['generated'],search['expanded'],0,len(path),0,search['depth'])
+
+# Search below one board, returns True when the goal is found with its moves left in path, otherwise
+# the smallest total cost above the bound, or None if there are no boards left below this one
+def ida_search(board,blank,cost,h_key,bound,horizontal,path,search):
+    search['generated'] += 1
+    total_cost = cost + estimate(h_key)
+    if total_cost > bound:
+        return total_cost
+    if board == goal:
+        return True
+    search['expanded'] += 1
+    if cost > search['depth']:
+        search['depth'] = cost
+    if search['expanded'] % check_interval == 0:
+        if search['deadline'] is not None and time.time() > search['deadline']:
+            raise TimeLimitExceeded()
+        if search['stats'] is not None:
+            search['stats'].update(search['generated'],search['expanded'],0,len(path),0,search['depth'])
+    minimum = None
+    for keep, mask, right, left, new_blank, move, target, first, offset in moves[blank]:
+        if first:
+            child_key = h_key
+        k = (board >> offset) & tile_mask
+        child_key = child_key + tile_key[k][target] - tile_key[k][new_blank]
+        if (move < horizontal_moves) == horizontal:
             continue
-        list_successors = successors(current[1])
-        visited[str(current[1].node_state)] = True
-        for s in list_successors:
-            #Check if the node is already visited
-            if str(s.node_state) in visited:
-                if visited[str(s.node_state)]:
+        path.append(move_names[move])
+        result = ida_search((board & keep) | ((board & mask) >> right << left),new_blank,cost+1,child_key,bound,
+                            move < horizontal_moves,path,search)
+        if result is True:
+            return True
+        path.pop()
+        if result is not None and (minimum is None or result < minimum):
+            minimum = result
+    return minimum
+
+
+
+# Anytime weighted A*
+# Weighted A* orders the fringe by f(s) = g(s) + w*h(s). It finds a solution much sooner than A*, but
+# the solution is only known to be at most w times longer than an optimal one. solve_anytime runs it
+# again and again with a lower w each time, dropping every board whose g(s) + h(s) is not below the
+# length of the best solution so far since it can not lead to a shorter one. It stops once a run with
+# w = 1, which is A*, ends or a run empties its fringe, either of which proves the best solution optimal.
+# The bound of a solution is its length over the lowest g(s) + h(s) on the fringe when it was found.
+# A board is pushed again whenever it is reached at a lower cost, so some board of an optimal solution
+# is always on the fringe with its optimal cost, and its g(s) + h(s) is at most the optimal length.
+# report(path, bound, w) is called with every shorter solution found.
+# time_limit, and max_open, the largest size the fringe may grow to, end the search with the best
+# solution found so far. TimeLimitExceeded is raised when there is none yet.
+def solve_anytime(initial_node,goal_state,time_limit=None,stats=None,weight=3.0,step=0.5,max_open=None,report=None):
+    initial, blank = pack(initial_node)
+    h_key = heuristic_2(initial)
+    deadline = time.time() + time_limit if time_limit is not None else None
+    expanded = generated = duplicates = depth = open_size = closed_size = 0
+    order = count()
+    best = None
+    lower = 0
+    timing = stats is not None and stats.timing
+    if stats is not None:
+        stats.begin()
+    pop, push, expand = heappop, heappush, successors
+    if timing:
+        saved = time_heuristic(stats)
+        pop, push = stats.timed('open list', heappop), stats.timed('open list', heappush)
+        expand = stats.timed('successors', successors)
+    try:
+        while True:
+            start_node = Node(initial,blank,0,None,None,h_key)
+            h = start_node.total_cost
+            fringe = [(weight*h,h,next(order),start_node)]
+            best_cost = {initial: 0}
+            limit = len(best) if best is not None else None
+            found = None
+            while fringe:
+                current = pop(fringe)[3]
+                if current.cost_of_move > best_cost[current.node_state]:
+                    duplicates += 1
+                    continue
+                if limit is not None and current.total_cost >= limit:
+                    continue
+                if is_goal(current):
+                    found = current
+                    break
+                expanded += 1
+                if current.cost_of_move > depth:
+                    depth = current.cost_of_move
+                if expanded % check_interval == 0:
+                    if deadline is not None and time.time() > deadline:
+                        raise TimeLimitExceeded()
+                    if stats is not None:
+                        stats.update(generated,expanded,duplicates,len(fringe),len(best_cost),depth)
+                if max_open is not None and len(fringe) > max_open:
+                    raise TimeLimitExceeded()
+                list_successors = expand(current)
+                generated += len(list_successors)
+                if timing:
+                    token = stats.start_phase()
+                for s in list_successors:
+                    if limit is not None and s.total_cost >= limit:
+                        continue
+                    if best_cost.get(s.node_state, s.cost_of_move + 1) <= s.cost_of_move:
+                        duplicates += 1
+                        continue
+                    best_cost[s.node_state] = s.cost_of_move
+                    h = s.total_cost - s.cost_of_move
+                    push(fringe,(s.cost_of_move + weight*h,h,next(order),s))
+                if timing:
+                    stats.end_phase('duplicates',token)
+            open_size, closed_size = max(open_size, len(fringe)), max(closed_size, len(best_cost))
+            if found is None:
+                # Nothing shorter than the best solution is left, so it is optimal
+                if best is not None and report is not None and lower < len(best):
+                    report(best, 1.0, weight)
+                return best
+            best = found.path()
+            lower = max(lower, min([len(best)] + [entry[3].total_cost for entry in fringe]))
+            bound = float(len(best)) / lower if lower > 0 else 1.0
+            if report is not None:
+                report(best, bound, weight)
+            if weight <= 1 or bound <= 1:
+                return best
+            weight = max(1.0, weight - step)
+    except TimeLimitExceeded:
+        if best is None:
+            raise
+        return best
+    finally:
+        if timing:
+            restore_heuristic(saved)
+        if stats is not None:
+            stats.finish(generated,expanded,duplicates,open_size,closed_size,depth)
+
+# Bidirectional search
+# A forward search from the initial board and a backward search from the goal run in turns and meet in
+# the middle. Every move is undone by the move of as many tiles along the same row or column the other
+# way, so the backward search generates its boards with the same move tables and its moves are turned
+# around with inverse_move when the two halves of the solution are joined.
+# The forward search uses the heuristic of the other searches. The pattern database only holds costs to
+# the goal, so the backward search uses the manhattan distance to the cells of the initial board.
+# The fringes are ordered as in fractional MM (Shaham et al. 2017, after MM by Holte et al. 2016): a
+# board of the forward search by p(s) = max(f(s), g(s)/share) and a board of the backward search by
+# max(f(s), g(s)/(1 - share)), so the forward search expands no board further than share of the way to
+# the goal and the backward search covers the rest. Every time a board is reached by both searches the
+# length of the path through it is a solution, and once the lowest p(s) on the two fringes is at least
+# the shortest of them no shorter solution can be left, so it is optimal. Boards with g(s) + h(s) at
+# least as long are never pushed. The direction with the lower p(s) at the front of its fringe is
+# expanded next, or the one with the smaller fringe when they are the same.
+# share defaults to 1/2, where the searches meet half way, when both heuristics are the manhattan
+# distance, and to 3/4 with the pattern database, whose heuristic is the stronger one.
+# time_limit and stats are the same as for solve()
+def solve_bidirectional(initial_node,goal_state,time_limit=None,stats=None,share=None):
+    initial, blank = pack(initial_node)
+    target, target_blank = pack(goal_state)
+    if initial == target:
+        return []
+    if share is None:
+        share = 0.5 if tile_key is distance else 0.75
+    back_key = build_distance(initial_node)
+    back_estimate = build_estimate()[0]
+    timing = stats is not None and stats.timing
+    if stats is not None:
+        stats.begin()
+    pop, push = heappop, heappush
+    if timing:
+        saved = time_heuristic(stats)
+        back_estimate = stats.timed('heuristic', back_estimate)
+        pop, push = stats.timed('open list', heappop), stats.timed('open list', heappush)
+    h_key = heuristic_2(initial)
+    back_h_key = sum(back_key[(target >> (bits*p)) & tile_mask][p] for p in range(0,cells))
+    # Per direction: the key table, the estimate, the share of the way, the fringe of (p(s), h(s),
+    # insertion order, board, blank, g(s), heuristic key) and board -> (g(s), board before, move code)
+    # for every board reached
+    forward = (tile_key, estimate, share, [(estimate(h_key),estimate(h_key),0,initial,blank,0,h_key)],
+               {initial: (0,None,None)})
+    backward = (back_key, back_estimate, 1 - share, [(back_estimate(back_h_key),back_estimate(back_h_key),1,target,
+                                                      target_blank,0,back_h_key)], {target: (0,None,None)})
+    order = count(2)
+    best, meet = None, None
+    deadline = time.time() + time_limit if time_limit is not None else None
+    expanded = generated = duplicates = depth = 0
+    try:
+        while True:
+            for keys, h_of, part, fringe, reached in (forward, backward):
+                while fringe and fringe[0][5] > reached[fringe[0][3]][0]:
+                    pop(fringe)
+                    duplicates += 1
+            fronts = [fringe[0][0] for keys, h_of, part, fringe, reached in (forward, backward) if fringe]
+            if best is not None and (len(fronts) < 2 or min(fronts) >= best):
+                break
+            if len(fronts) < 2:
+                return False
+            if (forward[3][0][0], len(forward[3])) <= (backward[3][0][0], len(backward[3])):
+                (keys, h_of, part, fringe, reached), other = forward, backward[4]
+            else:
+                (keys, h_of, part, fringe, reached), other = backward, forward[4]
+            priority, h, i, board, board_blank, cost, board_key = pop(fringe)
+            expanded += 1
+            if cost > depth:
+                depth = cost
+            if expanded % check_interval == 0:
+                if deadline is not None and time.time() > deadline:
+                    raise TimeLimitExceeded()
+                if stats is not None:
+                    stats.update(generated,expanded,duplicates,len(forward[3]) + len(backward[3]),
+                                 len(forward[4]) + len(backward[4]),depth)
+            cost += 1
+            if timing:
+                token = stats.start_phase()
+            for keep, mask, right, left, new_blank, move, cell, first, offset in moves[board_blank]:
+                if first:
+                    child_key = board_key
+                k = (board >> offset) & tile_mask
+                child_key = child_key + keys[k][cell] - keys[k][new_blank]
+                generated += 1
+                child = (board & keep) | ((board & mask) >> right << left)
+                if child in reached and reached[child][0] <= cost:
+                    duplicates += 1
+                    continue
+                h = h_of(child_key)
+                if best is not None and cost + h >= best:
                     continue
-            if is_goal(s):
-                return (s.path)
-            
-            if str(s.node_state) not in visited and s.node_state != initial_node:
-                fringe.put((s.total_cost,s))
+                reached[child] = (cost,board,move)
+                if child in other and (best is None or cost + other[child][0] < best):
+                    best, meet = cost + other[child][0], child
+                push(fringe,(max(cost + h,cost/part),h,next(order),child,new_blank,cost,child_key))
+            if timing:
+                stats.end_phase('successors',token)
+        # Moves from the initial board to the meeting board, then the backward moves turned around
+        path = []
+        state = meet
+        while forward[4][state][1] is not None:
+            path.append(move_names[forward[4][state][2]])
+            state = forward[4][state][1]
+        path.reverse()
+        state = meet
+        while backward[4][state][1] is not None:
+            path.append(move_names[inverse_move[backward[4][state][2]]])
+            state = backward[4][state][1]
+        return path
+    finally:
+        if timing:
+            restore_heuristic(saved)
+        if stats is not None:
+            stats.finish(generated,expanded,duplicates,len(forward[3]) + len(backward[3]),
+                         len(forward[4]) + len(backward[4]),depth)
 
-    return False
+# Search functions selectable from the command line
+searches = {'astar': solve, 'block': solve_block, 'ida': solve_ida, 'anytime': solve_anytime,
+            'bidirectional': solve_bidirectional}
 
 
+# Solution cache
+# The searches whose solutions are optimal and can go in the cache
+cacheable = ('astar', 'block', 'ida', 'bidirectional')
+
+# Follow the moves stored in a cache16.SolutionCache from a packed board to the goal, returns the move
+# strings or None when the board, or a board after it that has been dropped, is not in the cache
+def cached_path(cache,state,blank):
+    cache.tick()
+    entry = cache.get(state)
+    path = []
+    while entry is not None and entry[0] > 0:
+        state, blank = apply_move(state,blank,entry[1])
+        path.append(move_names[entry[1]])
+        following = cache.get(state)
+        if following is None or following[0] != entry[0] - 1:
+            return None
+        entry = following
+    return path if entry is not None else None
+
+# Add the boards along an optimal solution from initial_node to the cache
+def cache_solution(cache,initial_node,path):
+    cache.tick()
+    state, blank = pack(initial_node)
+    for i, name in enumerate(path):
+        code = move_names.index(name)
+        cache.put(state,len(path) - i,code)
+        state, blank = apply_move(state,blank,code)
+    cache.put(state,0,cache16.no_move)
+
+# Solve with a search of searches, answering from the cache straight away when the board is in it.
+# A* also uses the cache during the search. Solutions of the searches in cacheable are added to the cache.
+def solve_cached(initial_node,search,cache,time_limit=None,stats=None):
+    state, blank = pack(initial_node)
+    path = cached_path(cache,state,blank)
+    if path is not None:
+        return path
+    if search == 'astar':
+        path = solve(initial_node,goal_state,time_limit,stats,cache)
+    else:
+        path = searches[search](initial_node,goal_state,time_limit,stats)
+    if path is not False and search in cacheable:
+        cache_solution(cache,initial_node,path)
+    return path
+
 
 #We will check the parity of the initial board. If it is even then the puzzle is solvable, if it is odd
 # it cannot be solved
+# A horizontal move keeps the order of the tiles read row by row, and a vertical move takes each tile it
+# shifts past cols - 1 other tiles and the blank by one row. With an odd number of columns the parity of
+# the inversions can not change, and with an even number the parity of the inversions plus the row of
+# the blank can not, which has to match the goal with the blank in the last row.
 def is_solvable(initial_board):
     #Get the elements in the matrix as a list while preserving the order of numbers
     board = np.array(initial_board).flatten()
@@ -245,10 +895,11 @@ def is_solvable(initial_board):
             if board[i]>board[j] and board[i]!=0 and board[j]!= 0:
                 permutation_inversions +=1
     
-    #Adding the row number of the empty tile
-    zero_row = np.where(np.array(initial_state) == 0)[0][0] + 1 
+    #Adding the row number of the empty tile and of the last row, when there is an even number of columns
+    zero_row = np.where(np.array(initial_board) == 0)[0][0] + 1 
     
-    permutation_inversions = permutation_inversions + zero_row
+    if len(initial_board[0]) % 2 == 0:
+        permutation_inversions = permutation_inversions + zero_row + len(initial_board)
     #print permutation_inversions
     # If parity of the initial board is odd the puzzle cannot be solved.
     if permutation_inversions%2 == 1:
@@ -257,31 +908,200 @@ def is_solvable(initial_board):
         return True
 
 
+# Batch mode
+# Boards are read either from a directory with one board file per board, in the same format as a single
+# board, or from one file with a board per line given as its numbers in row order, cols numbers per row.
+# Returns a list of (board id, board) with the file name or the line number as the id.
+def read_boards(path):
+    boards = []
+    if os.path.isdir(path):
+        for filename in sorted(os.listdir(path)):
+            input_file = open(os.path.join(path,filename),"r")
+            boards.append((filename,[[int(num) for num in line.split()] for line in input_file.readlines() if line.strip()]))
+            input_file.close()
+    else:
+        input_file = open(path,"r")
+        for line_number, line in enumerate(input_file.readlines()):
+            numbers = [int(num) for num in line.split()]
+            if numbers:
+                boards.append((line_number + 1,[numbers[i:i+cols] for i in range(0,len(numbers),cols)]))
+        input_file.close()
+    return boards
+
+# Each worker process maps the pattern database once, the pages are shared between the workers
+# A worker also maps the solution cache when there is one, sharing its pages as well, and never saves it:
+# the solutions it finds are added to the cache file by the main process. shape is the (rows, cols) of the boards.
+def init_worker(pdb,cache_file=None,shape=(4,4)):
+    global worker_cache
+    if shape != (rows, cols):
+        set_shape(*shape)
+    if pdb is not None:
+        use_pattern_database(pdb)
+    worker_cache = cache16.SolutionCache(cache_file,writable=False) if cache_file is not None else None
+
+worker_cache = None
+
+# Solve one board of a batch in a worker process and return the result as a dict for the JSON line
+def solve_board(job):
+    board_id, board, search, time_limit = job
+    result = {'id': board_id}
+    stats = SearchStats()
+    start = time.time()
+    if len(board) != rows or any(len(row) != cols for row in board) or sorted(sum(board, [])) != list(range(0,cells)):
+        result['status'] = 'invalid'
+    elif not is_solvable(board):
+        result['status'] = 'unsolvable'
+    else:
+        try:
+            if worker_cache is not None:
+                solution = solve_cached(board,search,worker_cache,time_limit,stats)
+            else:
+                solution = searches[search](board,goal_state,time_limit,stats)
+            if solution is False:
+                result['status'] = 'no solution'
+            else:
+                result['status'] = 'solved'
+                result['moves'] = solution
+                result['cost'] = len(solution)
+        except TimeLimitExceeded:
+            result['status'] = 'timeout'
+    result['expanded'] = stats.expanded
+    result['seconds'] = round(time.time() - start, 6)
+    return result
+
+# Solve all the boards found at path across a pool of worker processes and write one JSON line per board
+# to output as soon as it is solved, so the lines come out in the order the boards finish in.
+# With a cache the solutions are added to it and it is saved once all the boards are done.
+def solve_batch(path,search,time_limit,workers,pdb,output,cache=None):
+    jobs = [(board_id, board, search, time_limit) for board_id, board in read_boards(path)]
+    boards = dict((board_id, board) for board_id, board, search, time_limit in jobs)
+    pool = multiprocessing.Pool(workers, init_worker, (pdb, cache.filename if cache is not None else None, (rows, cols)))
+    try:
+        for result in pool.imap_unordered(solve_board, jobs):
+            output.write(json.dumps(result) + "\n")
+            output.flush()
+            if cache is not None and result['status'] == 'solved' and search in cacheable:
+                cache_solution(cache,boards[result['id']],result['moves'])
+    finally:
+        pool.terminate()
+        pool.join()
+    if cache is not None:
+        cache.save()
+
+
 
 
+# Shape given with --shape as ROWSxCOLS
+def read_shape(text):
+    try:
+        board_rows, board_cols = [int(num) for num in text.lower().split('x')]
+    except ValueError:
+        raise argparse.ArgumentTypeError("the shape must be given as ROWSxCOLS, for example 4x4")
+    return board_rows, board_cols
+
 
  # Main Code
-if len(sys.argv) != 2:
-    print ("Please proper arguments")
-else:
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Solve the 16 puzzle, or a sliding puzzle of another shape, where every tile "
+                                                 "on one side of the blank in its row or column can be shifted in one move")
+    parser.add_argument("board", nargs="?", help="file with the initial board, one row per line and 0 for the blank tile")
+    parser.add_argument("--pdb", default=pdb16.default_file,
+                        help="pattern database built by pdb16.py, the manhattan distance is used if the file does not exist")
+    parser.add_argument("--search", choices=sorted(searches), default="astar",
+                        help="astar keeps every generated board, block is A* expanding blocks of boards with numpy, "
+                             "ida (iterative deepening A*) only keeps the current path, anytime is weighted A* that "
+                             "prints every shorter solution it finds until it proves one optimal, bidirectional searches from "
+                             "the board and from the goal at the same time until they meet")
+    parser.add_argument("--weight", type=float, default=3.0,
+                        help="weight of the heuristic in the first run of --search anytime (default %(default)s)")
+    parser.add_argument("--max-open", type=int, metavar="BOARDS",
+                        help="stop --search anytime with the best solution so far once its fringe holds this many boards")
+    parser.add_argument("--batch", metavar="PATH",
+                        help="solve every board in a directory of board files or in a file with one board per line "
+                             "and print one JSON line per board as it finishes")
+    parser.add_argument("--shape", type=read_shape, default=(4,4), metavar="ROWSxCOLS",
+                        help="shape of the boards in batch mode (default 4x4), a single board has the shape of its file")
+    parser.add_argument("--workers", type=int, default=multiprocessing.cpu_count(),
+                        help="number of worker processes in batch mode, defaults to the number of cores")
+    parser.add_argument("--time-limit", type=float, default=None,
+                        help="give up on a board after this many seconds, --search anytime returns the best solution so far")
+    parser.add_argument("--cache", metavar="FILE",
+                        help="keep the optimal solutions found in FILE and answer boards on them from it, "
+                             "the file is created when it does not exist")
+    parser.add_argument("--cache-size", type=int, default=cache16.default_size, metavar="BOARDS",
+                        help="boards kept in the cache, the least recently used are dropped (default %(default)s)")
+    parser.add_argument("--stats-json", metavar="FILE",
+                        help="write the counters of the search to FILE as JSON")
+    parser.add_argument("--progress", type=float, metavar="SECONDS",
+                        help="print a progress line to stderr every SECONDS seconds")
+    parser.add_argument("--phase-times", action="store_true",
+                        help="time the phases of the search for --stats-json, this slows the search down")
+    args = parser.parse_args()
+    if (args.board is None) == (args.batch is None):
+        parser.error("pass either a board file or --batch")
+    if args.batch is not None and (args.stats_json or args.progress or args.phase_times):
+        parser.error("--stats-json, --progress and --phase-times are for a single board")
+
 # Get the intial configuration on the board from the input file
     initial_state = []
-    filename = str(sys.argv[1])
-    print filename
-    input_file = open(filename,"r")
-       # A zero in a given square indicates no piece
-    initial_state = [[int(num) for num in line.split()] for line in input_file.readlines()]
-    input_file.close()
-    
-    goal_state = [[1,2,3,4],[5,6,7,8],[9,10,11,12],[13,14,15,0]]
-    
+    filename = args.board
+    shape = args.shape
+    if filename is not None:
+        input_file = open(filename,"r")
+           # A zero in a given square indicates no piece
+        initial_state = [[int(num) for num in line.split()] for line in input_file.readlines() if line.strip()]
+        input_file.close()
+        shape = (len(initial_state), len(initial_state[0]) if initial_state else 0)
+        if any(len(row) != shape[1] for row in initial_state) or \
+           sorted(sum(initial_state, [])) != list(range(0,shape[0]*shape[1])):
+            parser.error(filename + " must hold the numbers from 0 up in rows of the same length")
+    try:
+        set_shape(*shape)
+    except ValueError as error:
+        parser.error(str(error))
+    if args.search == "block" and move_block is None:
+        parser.error("--search block only takes boards that fit in 64 bits")
+    if args.cache and shape != (4,4):
+        parser.error("--cache only holds 4 x 4 boards")
+    if args.cache and args.search not in cacheable:
+        parser.error("--cache holds optimal solutions, it can not be used with --search " + args.search)
+
+    # The pattern database is only for the 16 puzzle, other shapes use the manhattan distance
+    pdb = args.pdb if os.path.exists(args.pdb) and shape == (4,4) else None
+    if pdb is not None:
+        use_pattern_database(pdb)
+
+    cache = cache16.SolutionCache(args.cache,args.cache_size) if args.cache else None
+
+    if args.batch is not None:
+        solve_batch(args.batch,args.search,args.time_limit,args.workers,pdb,sys.stdout,cache)
+        sys.exit(0)
+
+    print (filename)
     if is_solvable(initial_state):
-        solution = solve(initial_state,goal_state)
-        if solution:
-            print "Solution Found"
-            print " ".join(solution)
+        stats = SearchStats(args.phase_times,args.progress)
+        def report(path, bound, weight):
+            print ("%d moves, at most %.3f times optimal (weight %g): %s" % (len(path), bound, weight, " ".join(path)))
+        try:
+            if args.search == "anytime":
+                solution = solve_anytime(initial_state,goal_state,args.time_limit,stats,args.weight,
+                                         max_open=args.max_open,report=report)
+            elif cache is not None:
+                solution = solve_cached(initial_state,args.search,cache,args.time_limit,stats)
+                cache.save()
+            else:
+                solution = searches[args.search](initial_state,goal_state,args.time_limit,stats)
+        except TimeLimitExceeded:
+            solution = None
+        if args.stats_json:
+            stats.write_json(args.stats_json)
+        if solution is None:
+            print ("No solution found within the limits")
+        elif solution:
+            print ("Solution Found")
+            print (" ".join(solution))
         else:
-            print "No Solution"
+            print ("No Solution")
        
     else:
-        print "Given board has odd parity, hence it cannot be solved."
+        print ("Given board has odd parity, hence it cannot be solved.")